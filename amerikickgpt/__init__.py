@@ -0,0 +1,31 @@
+"""
+AmerikickGPT chat engine. ui.py is the streamlit front end and server.py a headless http one,
+both stream answers from engine.respond.
+"""
+import importlib
+import os
+import threading
+
+# on by default, the engine loads in the background after the first paint instead of before it.
+# tool dependencies (pandas, whoosh, gspread) always load when their tool is first used
+DEFERRED_INIT = os.environ.get('DEFERRED_INIT', '1').lower() in ('1', 'true', 'yes')
+
+def _preload():
+    try:
+        importlib.import_module('amerikickgpt.engine')
+        importlib.import_module('amerikickgpt.async_runtime').get_async_openai_client()
+    except Exception as e:
+        print(f'Unable to preload the chat engine: {e}')
+
+    assignments = importlib.import_module('amerikickgpt.assignments')
+    if assignments.ASSIGNMENT_PREFETCH:
+        # judging assignments load and refresh on their own thread, once per process
+        assignments.start_assignment_refresh()
+
+def preload(background: bool = True):
+    """
+    Imports the engine and creates the OpenAI client ahead of the first question.
+    """
+    if not background:
+        return _preload()
+    threading.Thread(target = _preload, name = 'preload', daemon = True).start()
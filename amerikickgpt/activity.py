@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+from .sheet import get_sheet
+from .sheet_logger import get_sheet_logger
+from .session_store import ACTIVITY_WORKSHEET_ROWS, record_session, get_latest_session, read_latest_session_from_worksheet
+
+SESSION_DATE_FORMAT = "%I:%M%p %A, %B %d"
+# messages within this many minutes of the last logged session continue it
+SESSION_MINUTES = 15
+
+def append_session_date(email, worksheet_name, session_date, session_count):
+    record_session(email, session_date, session_count)
+    get_sheet_logger(get_sheet()).log(worksheet_name, [session_date, session_count])
+
+def ensure_worksheet_exists(email, worksheet_name, session_date, session_count):
+    """
+    Creates the user's activity worksheet if needed and logs a new session. Returns (session_date, session_count)
+    of the user's last session when it is recent enough to continue, otherwise None.
+    """
+    import gspread
+
+    sheet = get_sheet()
+    continued_session = None
+    worksheet = None
+    try:
+        # sessions logged from this host are in the local store, so the sheet is only read for unseen emails
+        latest_session = get_latest_session(email)
+        if latest_session is None:
+            worksheet = sheet.worksheet(worksheet_name)
+            latest_session = read_latest_session_from_worksheet(worksheet)
+            print(f"Worksheet '{worksheet_name}' already exists.")
+
+        if latest_session is not None:
+            latest_session_time, latest_session_count = latest_session
+
+            last_session = datetime.strptime(latest_session_time, SESSION_DATE_FORMAT)
+            current_session = datetime.strptime(session_date, SESSION_DATE_FORMAT)
+            if current_session - timedelta(minutes = SESSION_MINUTES) < last_session:
+                continued_session = (last_session.strftime(SESSION_DATE_FORMAT), int(latest_session_count))
+
+    except gspread.exceptions.WorksheetNotFound:
+        worksheet = sheet.add_worksheet(title=worksheet_name, rows=str(ACTIVITY_WORKSHEET_ROWS), cols="20")
+        print(f"Worksheet '{worksheet_name}' created.")
+        worksheet.append_row(['session_time', 'num_messages', 'user_prompt', 'message', 'time'])
+
+    if worksheet is not None:
+        get_sheet_logger(sheet).cache_worksheet(worksheet)
+    if continued_session is None:
+        append_session_date(email, worksheet_name, session_date, session_count)
+    return continued_session
+
+
+def append_message_to_worksheet(email, worksheet_name, session_date, session_count, prompt, message):
+    now = datetime.now().strftime(SESSION_DATE_FORMAT)
+    record_session(email, session_date, session_count)
+    get_sheet_logger(get_sheet()).log(worksheet_name, [session_date, session_count, prompt, message, now])
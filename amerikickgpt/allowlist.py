@@ -0,0 +1,58 @@
+import os
+import threading
+import time
+from .sheet import get_sheet
+
+# how long the verified email list is served before it is reloaded in the background
+ALLOWLIST_REFRESH_SECONDS = int(os.environ.get('ALLOWLIST_REFRESH_SECONDS', 300))
+
+_emails = None
+_loaded_at = None
+_refreshing = threading.Lock()
+
+def normalize_email(email: str) -> str:
+    return str(email).strip().lower()
+
+def load_allowlist(sheet = None) -> frozenset:
+    global _emails, _loaded_at
+
+    if sheet is None:
+        sheet = get_sheet()
+    emails = frozenset(normalize_email(x) for x in sheet.worksheet("users").col_values(1)[1:] if x)
+    _emails, _loaded_at = emails, time.monotonic()
+    return emails
+
+def _refresh_in_background(sheet = None):
+    if not _refreshing.acquire(blocking = False):
+        return
+    try:
+        load_allowlist(sheet)
+    except Exception as e:
+        print(f'Unable to refresh the email allowlist: {e}')
+    finally:
+        _refreshing.release()
+
+def warm_allowlist(sheet = None):
+    """
+    Starts loading the allowlist without blocking, ie while the email screen renders.
+    Without a sheet the spreadsheet is opened on the background thread too.
+    """
+    if _emails is None or time.monotonic() - _loaded_at > ALLOWLIST_REFRESH_SECONDS:
+        threading.Thread(target = _refresh_in_background, args = (sheet,), daemon = True).start()
+
+def get_allowlist(sheet) -> frozenset:
+    """
+    Process wide set of verified emails shared by every session. Only the very first
+    lookup in a process waits on sheets, stale lists are refreshed in the background.
+    """
+    if _emails is None:
+        # waits on a warm up that is already in flight instead of starting a second read
+        with _refreshing:
+            if _emails is None:
+                load_allowlist(sheet)
+    else:
+        warm_allowlist(sheet)
+    return _emails
+
+def is_allowed(sheet, email: str) -> bool:
+    return normalize_email(email) in get_allowlist(sheet)
@@ -0,0 +1,68 @@
+import os
+import re
+from typing import Iterable
+from fuzzywuzzy import fuzz, process
+from .cache import get_cache
+
+# tools that return the same text for every user. an answer is only cached when every tool the model
+# called for it is in this set, so per user results like judging assignments are never cached. the engine
+# also only stores answers to the first question of a conversation, see run_conversation_async
+STATIC_TOOLS = frozenset({
+    'get_referee_dress_code',
+    'get_event_map',
+    'get_tournament_website',
+    'get_tournament_address',
+    'get_parking_information',
+    'get_promoters',
+    'get_musical_rule',
+    'get_developer_info',
+})
+# how similar (0-100) a new question must be to a cached one to reuse its answer
+ANSWER_MATCH_THRESHOLD = int(os.environ.get('ANSWER_MATCH_THRESHOLD', 92))
+
+answers = get_cache('answers', ttl = 6 * 60 * 60, maxsize = 512)
+
+def normalize_prompt(prompt: str) -> str:
+    prompt = re.sub(r"[^a-z0-9 ]+", ' ', prompt.lower().replace("'", ''))
+    return ' '.join(prompt.split())
+
+def lookup_answer(prompt: str):
+    """
+    Returns the cached answer for the same or a near identical question, or None.
+    """
+    key = normalize_prompt(prompt)
+    if not key:
+        return None
+
+    entry = answers.lookup(key)
+    if entry is None:
+        match = process.extractOne(key, answers.keys(), scorer = fuzz.token_sort_ratio, score_cutoff = ANSWER_MATCH_THRESHOLD)
+        # numbers change the meaning of a question (ring 5 vs ring 6), so they have to agree exactly
+        if match is not None and re.findall(r'\d+', match[0]) == re.findall(r'\d+', key):
+            entry = answers.lookup(match[0])
+    if entry is None:
+        return None
+
+    print(f'answer cache hit for {key!r}')
+    return entry['answer']
+
+def store_answer(prompt: str, answer: str, tools_used: Iterable[str]):
+    tools_used = frozenset(tools_used)
+    if not answer or not tools_used or not tools_used <= STATIC_TOOLS:
+        return False
+    answers.set(normalize_prompt(prompt), {'answer': answer, 'tools': tools_used})
+    return True
+
+def invalidate_answers(prompt: str = None, tool: str = None):
+    """
+    Drops one question, every answer built from a tool (ie after its text is edited), or everything.
+    """
+    if prompt is not None:
+        answers.invalidate(normalize_prompt(prompt))
+    elif tool is not None:
+        for key in answers.keys():
+            entry = answers.lookup(key)
+            if entry is not None and tool in entry['tools']:
+                answers.invalidate(key)
+    else:
+        answers.invalidate()
@@ -0,0 +1,147 @@
+"""
+Judge and scorekeeper assignments for every verified official, loaded ahead of the morning rush.
+
+Officials check their assignment again and again before each day starts. The store loads the assignment
+of every email on the users worksheet into the judging cache, the same per-email map the
+get_judging_or_scorekeeper_assignment tool reads. After that only the emails that asked recently are reloaded
+in the background a little before they expire, everyone else is fetched again when they next ask.
+The tool still only ever looks up the current user's own email.
+
+Run before doors open:
+
+    python -m amerikickgpt.assignments                                  # load once in this process and report
+    python -m amerikickgpt.assignments --server http://127.0.0.1:8080   # warm a running chat server
+
+Set ASSIGNMENT_PREFETCH=1 to load and refresh them whenever the engine starts.
+"""
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from . import async_runtime
+from .allowlist import get_allowlist, normalize_email
+from .endpoints import afetch_judging_assignment
+
+ASSIGNMENT_PREFETCH = os.environ.get('ASSIGNMENT_PREFETCH', '0').lower() in ('1', 'true', 'yes')
+# kept under the judging cache's ttl so loaded assignments are replaced before they expire
+ASSIGNMENT_REFRESH_SECONDS = int(os.environ.get('ASSIGNMENT_REFRESH_SECONDS', 90))
+# upper bound on requests to the judging endpoint at the same time while loading
+ASSIGNMENT_FETCH_CONCURRENCY = int(os.environ.get('ASSIGNMENT_FETCH_CONCURRENCY', 8))
+# how long after an official last asked their assignment is kept refreshed
+ASSIGNMENT_RECENT_SECONDS = int(os.environ.get('ASSIGNMENT_RECENT_SECONDS', 3600))
+
+_refresher = None
+_refresher_lock = threading.Lock()
+# email -> when it last asked in this process
+_recent_emails = {}
+_recent_lock = threading.Lock()
+
+def assignment_email(email: str) -> str:
+    # the allowlist verified the normalized email, so the store and the tool key assignments by it
+    if not email:
+        return email
+    email = normalize_email(email)
+    with _recent_lock:
+        _recent_emails[email] = time.monotonic()
+    return email
+
+def recent_emails() -> list:
+    """
+    The emails that asked for their assignment within ASSIGNMENT_RECENT_SECONDS, dropping the older ones.
+    """
+    cutoff = time.monotonic() - ASSIGNMENT_RECENT_SECONDS
+    with _recent_lock:
+        for email, asked in list(_recent_emails.items()):
+            if asked < cutoff:
+                del _recent_emails[email]
+        return sorted(_recent_emails)
+
+async def load_assignments_async(emails: list) -> int:
+    """
+    Fetches each email's assignment from the endpoint, skipping the cache, and stores it in the judging cache.
+    Returns the number loaded, an email that fails keeps its previous entry until it expires.
+    """
+    semaphore = asyncio.Semaphore(ASSIGNMENT_FETCH_CONCURRENCY)
+    cache = afetch_judging_assignment.cache
+    # every official is loaded, so the cache grows to hold them all instead of evicting earlier ones mid load.
+    # twice the list leaves room for entries of emails dropped from the allowlist until they expire
+    cache.maxsize = max(cache.maxsize, 2 * len(emails))
+
+    async def load(email):
+        async with semaphore:
+            try:
+                # error statuses, ie a 429 from the endpoint, are raised by http_client and never stored
+                assignment = await afetch_judging_assignment.__wrapped__(email)
+            except Exception as e:
+                print(f'Unable to load the judging assignment for {email}: {e}')
+                return False
+        # the same key the cached fetch uses for a call with just the email
+        cache.set(((email,), ()), assignment)
+        return True
+
+    return sum(await asyncio.gather(*(load(email) for email in emails)))
+
+def load_assignments(sheet = None) -> dict:
+    started = time.perf_counter()
+    emails = sorted(get_allowlist(sheet))
+    loaded = async_runtime.run(load_assignments_async(emails))
+    stats = {'emails': len(emails), 'loaded': loaded, 'seconds': round(time.perf_counter() - started, 2)}
+    print(f"Loaded {loaded} of {len(emails)} judging assignments in {stats['seconds']}s")
+    return stats
+
+def refresh_recent_assignments() -> int:
+    emails = recent_emails()
+    return async_runtime.run(load_assignments_async(emails)) if emails else 0
+
+def _refresh_forever(sheet, load_first: bool):
+    if load_first:
+        try:
+            load_assignments(sheet)
+        except Exception as e:
+            print(f'Unable to load judging assignments: {e}')
+    while True:
+        time.sleep(ASSIGNMENT_REFRESH_SECONDS)
+        try:
+            refresh_recent_assignments()
+        except Exception as e:
+            print(f'Unable to refresh judging assignments: {e}')
+
+def start_assignment_refresh(sheet = None, load_first: bool = True):
+    """
+    Starts loading every assignment in the background and then reloading the recently asked ones, once per process.
+    """
+    global _refresher
+    with _refresher_lock:
+        if _refresher is None:
+            _refresher = threading.Thread(target = _refresh_forever, args = (sheet, load_first), name = 'assignment-refresh', daemon = True)
+            _refresher.start()
+
+def warm_assignments(sheet = None) -> dict:
+    """
+    Loads every verified official's assignment now and keeps the ones being asked for refreshed. Safe to call again, ie by the warm up command.
+    """
+    stats = load_assignments(sheet)
+    start_assignment_refresh(sheet, load_first = False)
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Load every verified judge and scorekeeper assignment before doors open')
+    parser.add_argument('--server', help = 'url of a running chat server to warm instead of this process')
+    args = parser.parse_args()
+
+    if args.server is None:
+        print(json.dumps(load_assignments()))
+        return
+
+    import requests
+
+    token = os.environ.get('CHAT_SERVER_TOKEN')
+    headers = {'Authorization': f'Bearer {token}'} if token else {}
+    response = requests.post(f"{args.server.rstrip('/')}/warmup", headers = headers, timeout = 300)
+    response.raise_for_status()
+    print(json.dumps(response.json()))
+
+if __name__ == '__main__':
+    main()
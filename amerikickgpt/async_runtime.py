@@ -0,0 +1,79 @@
+import asyncio
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+# threads the event loop may use for sync work, ie whoosh searches and the pandas schedule tools
+ASYNC_TOOL_THREADS = int(os.environ.get('ASYNC_TOOL_THREADS', 16))
+
+# one event loop per process runs every conversation, it lives on this module so it survives streamlit reruns
+_loop = None
+_loop_lock = threading.Lock()
+_openai_client = None
+_DONE = object()
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _loop.set_default_executor(ThreadPoolExecutor(max_workers = ASYNC_TOOL_THREADS, thread_name_prefix = 'async-tool'))
+            threading.Thread(target = _loop.run_forever, name = 'conversation-loop', daemon = True).start()
+    return _loop
+
+def get_async_openai_client() -> 'AsyncOpenAI':
+    """
+    Shared async OpenAI client, only use it from coroutines running on the conversation loop.
+    """
+    global _openai_client
+    if _openai_client is None:
+        from openai import AsyncOpenAI
+
+        _openai_client = AsyncOpenAI(api_key = os.environ.get('OPENAI_API_KEY'))
+    return _openai_client
+
+def run(coroutine, timeout: float = None):
+    """
+    Runs a coroutine on the conversation loop and waits for its result.
+    """
+    return asyncio.run_coroutine_threadsafe(coroutine, get_loop()).result(timeout)
+
+def iterate(async_iterator):
+    """
+    Sync generator over an async generator that runs on the conversation loop, for st.write_stream.
+    Only the calling thread waits on the items, the upstream requests are multiplexed on the loop.
+    If the caller stops early the async generator is cancelled.
+    """
+    items = queue.Queue()
+
+    async def pump():
+        error = None
+        try:
+            async for item in async_iterator:
+                items.put((item, None))
+        except Exception as e:
+            error = e
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            # always ends the stream, a cancelled conversation must not leave the caller waiting on the queue
+            items.put((_DONE, error))
+            await async_iterator.aclose()
+
+    future = asyncio.run_coroutine_threadsafe(pump(), get_loop())
+    try:
+        while True:
+            item, error = items.get()
+            if error is not None:
+                raise error
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        future.cancel()
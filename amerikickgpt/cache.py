@@ -0,0 +1,198 @@
+import asyncio
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries expire after ttl seconds. Concurrent misses for the same key
+    are coalesced so only one caller runs the loader and the rest wait for its result.
+    """
+    def __init__(self, name: str, ttl: float, maxsize: int = 256):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def _claim(self, key):
+        """
+        Returns (value, None, False) for a fresh entry, otherwise (None, call, leader) where the leader runs
+        the loader and everyone else waits on the in flight call.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value, None, False
+                del self._entries[key]
+
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                return None, call, False
+            call = self._calls[key] = Future()
+            self.misses += 1
+            return None, call, True
+
+    def _settle(self, key, call, value = None, error = None):
+        with self._lock:
+            del self._calls[key]
+        if error is None:
+            call.set_result(value)
+        elif isinstance(error, Exception):
+            # failures are handed to the waiting callers but never cached
+            call.set_exception(error)
+        else:
+            # the leader was interrupted (ie its conversation was cancelled), which is not the waiters' error,
+            # so the call is cancelled and they retry the load themselves
+            call.cancel()
+
+    def get(self, key, loader):
+        while True:
+            value, call, leader = self._claim(key)
+            if call is None:
+                return value
+            if leader:
+                break
+            try:
+                return call.result()
+            except CancelledError:
+                continue
+
+        try:
+            value = loader()
+        except BaseException as e:
+            self._settle(key, call, error = e)
+            raise
+        self.set(key, value)
+        self._settle(key, call, value)
+        return value
+
+    async def aget(self, key, loader):
+        """
+        Same as get for coroutine loaders. In flight loads are shared with sync callers of the same cache.
+        """
+        while True:
+            value, call, leader = self._claim(key)
+            if call is None:
+                return value
+            if leader:
+                break
+            try:
+                # shielded so a waiter that is cancelled itself leaves the shared call running for the others
+                return await asyncio.shield(asyncio.wrap_future(call))
+            except asyncio.CancelledError:
+                if not call.cancelled():
+                    raise
+
+        try:
+            value = await loader()
+        except BaseException as e:
+            self._settle(key, call, error = e)
+            raise
+        self.set(key, value)
+        self._settle(key, call, value)
+        return value
+
+    def lookup(self, key):
+        """
+        Returns the cached value or None, without loading on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def keys(self) -> list:
+        now = time.monotonic()
+        with self._lock:
+            return [key for key, (expires, _) in self._entries.items() if expires > now]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last = False)
+                self.evictions += 1
+
+    def invalidate(self, key = None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            'ttl': self.ttl,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'evictions': self.evictions,
+        }
+
+# caches are registered by name on this module so they survive streamlit rerunning ui.py
+caches = {}
+_caches_lock = threading.Lock()
+
+def get_cache(name: str, ttl: float, maxsize: int = 256) -> TTLCache:
+    with _caches_lock:
+        if name not in caches:
+            # CACHE_TTL_<NAME> overrides the default ttl, ie CACHE_TTL_RING=10
+            ttl = float(os.environ.get(f'CACHE_TTL_{name.upper()}', ttl))
+            caches[name] = TTLCache(name, ttl, maxsize)
+        return caches[name]
+
+def cached(name: str, ttl: float, maxsize: int = 256):
+    """
+    Caches a function's results by its arguments in the named cache. Works on coroutine functions too,
+    so a sync fetcher and its async twin registered under the same name share entries.
+    """
+    cache = get_cache(name, ttl, maxsize)
+
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                key = (args, tuple(sorted(kwargs.items())))
+                return await cache.aget(key, lambda: func(*args, **kwargs))
+
+            wrapper.cache = cache
+            return wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            return cache.get(key, lambda: func(*args, **kwargs))
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+def cache_stats() -> dict:
+    return {name: cache.stats() for name, cache in caches.items()}
+
+def invalidate_all():
+    for cache in caches.values():
+        cache.invalidate()
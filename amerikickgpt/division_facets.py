@@ -0,0 +1,151 @@
+import re
+
+# oldest age a division can be for, used as the upper end of "18 & over" style brackets
+MAX_AGE = 99
+# men, women and adults without an age mean the adult divisions, 18 & over
+ADULT_AGE = 18
+# bumped whenever parsing changes what is indexed for a name, so the division index is rebuilt
+FACETS_VERSION = 3
+
+# (pattern, facet field, values) for the rank, gender and event terms used in division names and questions
+FACET_TERMS = [
+    # before "black belt" so under belt divisions are not taken for black belt ones
+    (r'under black belts?|colou?r(?:ed)? ?belts?|kyu|under ?belts?', 'rank', ['color']),
+    (r'black ?belts?', 'rank', ['black']),
+    (r'(white|yellow|orange|purple|blue|green|brown|red)(?: \d)? belts?', 'rank', ['color']),
+    (r'beginners?|beginer|beg', 'rank', ['color', 'beginner']),
+    (r'intermediate|intermed|int', 'rank', ['color', 'intermediate']),
+    (r'advanced|adv', 'rank', ['color', 'advanced']),
+    (r'all (?:colou?r belts? )?ranks?|all ages/ranks', 'rank', ['all']),
+    # longest spellings first, the first alternative that matches wins
+    (r'boys?|males?|men\'s|mens|m[ae]n', 'gender', ['male']),
+    (r'girls?|females?|women\'s|womens|wom[ae]n|ladies', 'gender', ['female']),
+    # names no gender, the word only implies the adult ages
+    (r'adults?', 'gender', []),
+    (r'forms?|kata', 'event', ['forms']),
+    (r'weapons?', 'event', ['weapons']),
+    (r'(?:point )?sparring|fighting', 'event', ['sparring']),
+    # the feed runs some weights into the word, ie "continuous143.3 lbs"
+    (r'continuous', 'event', ['sparring', 'continuous']),
+    # weight classes, ie the "30+ lw v 40+ lw" semi-finals, only exist for sparring
+    (r'lw|mw|hw', 'event', ['sparring']),
+    # takes "fight" or "fighting" with it so they aren't read as sparring, the feed also spells it "choregraphed"
+    (r'chore?o?graphed(?: fight(?:s|ing)?)?', 'event', ['choreographed']),
+    (r'self[ -]?defen[cs]e', 'event', ['selfdefense']),
+    (r'demo(?:nstration)?(?: teams?)?', 'event', ['demo']),
+    (r'creative', 'event', ['creative']),
+    (r'musical|music', 'event', ['musical']),
+    (r'extreme', 'event', ['extreme']),
+    (r'cmx', 'event', ['creative', 'musical', 'extreme']),
+    (r'traditional|tradtional|trad', 'event', ['traditional']),
+]
+
+# the continuous and open divisions mark gender with (m), (f) and (m/f) instead of words
+GENDER_MARKS = {'(m)': {'male'}, '(f)': {'female'}, '(m/f)': {'male', 'female'}}
+
+# two digit ages only, so weights like "150-159 lbs" and "70.5 - 92.5" are not read as ages
+_AGE = r'(?<![\d.])(\d{1,2})'
+_NOT_WEIGHT = r'(?![\d.]|\s*(?:lbs|kg))'
+AGE_PATTERNS = [
+    # "14-17", "14 - 17", "10 & 11", "8-9 yrs"
+    (re.compile(_AGE + r'\s*(?:-|&|to)\s*(\d{1,2})' + _NOT_WEIGHT + r'(?:\s*(?:yrs|years?)(?: old)?)?'), lambda low, high: (int(low), int(high))),
+    # "13 & under", "11 and younger", "7 under", "17-"
+    (re.compile(_AGE + r'\s*(?:(?:&|and)?\s*(?:under|younger)|-(?!\s*\d))'), lambda high: (0, int(high))),
+    # "18+", "18 & over", "50 & older", "18 and up"
+    (re.compile(_AGE + r'\s*(?:\+|(?:&|and)\s*(?:over|older|up))'), lambda low: (int(low), MAX_AGE)),
+    # "age 15", "15 year old", "15yo", only used by questions
+    (re.compile(r'(?:ages?|aged)\s*(\d{1,2})\b|' + _AGE + r'\s*(?:yrs?|years?(?: old)?|yo)\b'), lambda *ages: (int(next(age for age in ages if age)),) * 2),
+    (re.compile(r'all ages'), lambda: (0, MAX_AGE)),
+]
+
+_adult_pattern = re.compile(r"\b(?:men's|mens|m[ae]n|women's|womens|wom[ae]n|ladies|adults?)\b")
+
+# terms may run into a number but not into more letters
+_facet_pattern = re.compile('|'.join(
+    [rf'(?P<term{index}>\b(?:{pattern})(?![^\W\d_]))' for index, (pattern, _, _) in enumerate(FACET_TERMS)]
+    + [r'(?P<mark>\((?:m|f|m/f)\))']
+))
+
+def age_range(text: str):
+    """
+    Returns ((min age, max age), (start, end) of the match) for the first age or age bracket in the text, or None.
+    """
+    matches = [(match.start(), match, parse) for pattern, parse in AGE_PATTERNS for match in [pattern.search(text)] if match]
+    if not matches:
+        return None
+    _, match, parse = min(matches, key = lambda found: found[0])
+    return parse(*match.groups()), match.span()
+
+def parse_facets(text: str):
+    """
+    Reads the age range, rank, gender and event terms in a division name or question.
+    Returns the facets and the text left once they are removed.
+    """
+    text = text.lower()
+    facets = {'rank': set(), 'gender': set(), 'event': set()}
+    spans = []
+
+    ages = age_range(text)
+    if ages is not None:
+        (facets['min_age'], facets['max_age']), (start, end) = ages
+        spans.append((start, end))
+        # blanked so the "under" of "11 & under black belt" isn't read as an under belt rank
+        text = text[:start] + ' ' * (end - start) + text[end:]
+    elif _adult_pattern.search(text):
+        # "women's black belt forms" is about the adult divisions, not the girls ones
+        facets['min_age'], facets['max_age'] = ADULT_AGE, MAX_AGE
+
+    for match in _facet_pattern.finditer(text):
+        if match.lastgroup == 'mark':
+            facets['gender'].update(GENDER_MARKS[match.group(0)])
+        else:
+            _, field, values = FACET_TERMS[int(match.lastgroup[len('term'):])]
+            facets[field].update(values)
+        spans.append(match.span())
+
+    remainder = text
+    for start, end in sorted(spans, reverse = True):
+        remainder = remainder[:start] + ' ' + remainder[end:]
+    return facets, ' '.join(remainder.split())
+
+def without_ages(text: str) -> str:
+    """
+    The text with its age or age bracket removed, ie to rank divisions that were already filtered by age.
+    """
+    ages = age_range(text.lower())
+    if ages is None:
+        return text
+    _, (start, end) = ages
+    return text[:start] + ' ' + text[end:]
+
+def division_facets(name: str) -> dict:
+    """
+    The facet fields indexed for a division name. Divisions that don't name a gender are open to both.
+    """
+    facets, _ = parse_facets(name)
+    fields = {field: ' '.join(sorted(values)) for field, values in facets.items() if field in ('rank', 'event') and values}
+    fields['gender'] = ' '.join(sorted(facets['gender'] or {'male', 'female'}))
+    if 'min_age' in facets:
+        fields['min_age'], fields['max_age'] = facets['min_age'], facets['max_age']
+    return fields
+
+def facet_filter(facets: dict):
+    """
+    A whoosh query matching divisions with every facet in the question, or None if it names none.
+    Ages match divisions whose bracket overlaps the question's age or bracket.
+    """
+    from whoosh import query
+
+    terms = []
+    if 'min_age' in facets:
+        terms.append(query.NumericRange('min_age', None, facets['max_age']))
+        terms.append(query.NumericRange('max_age', facets['min_age'], None))
+    # "black belt girls" means the black belt rank, not any color belt level
+    ranks = facets['rank'] - {'color'} if facets['rank'] - {'color'} else facets['rank']
+    if ranks:
+        terms.append(query.Or([query.Term('rank', rank) for rank in ranks | {'all'}]))
+    if facets['gender']:
+        terms.append(query.Or([query.Term('gender', gender) for gender in facets['gender']]))
+    for event in facets['event']:
+        terms.append(query.Term('event', event))
+    return query.And(terms) if terms else None
@@ -0,0 +1,132 @@
+import re
+from functools import lru_cache
+from fuzzywuzzy import fuzz
+from whoosh.analysis import Filter, StandardAnalyzer
+
+# words competitors use for the terms in division names, applied to the name field at index and query time
+SYNONYMS = {
+    'trad': 'traditional',
+    'tradtional': 'traditional',
+    'fighting': 'sparring',
+    'sync': 'synchronized',
+    'mens': 'men',
+    'womens': 'women',
+}
+
+# rewrites that only apply when the phrase mentions one of the trigger terms,
+# as (trigger terms, words to rewrite, replacement)
+QUERY_RULES = [
+    # challenge divisions are named by age bracket without "and under"
+    (('korean challenge', 'traditional challenge'), ['and under'], ''),
+    # continuous divisions are named by age and weight class, not gender
+    (('continuous',), ['sparring', 'boys', 'girls'], ''),
+    (('continuous',), ['mens', "men's", 'womens', "women's"], '18 & over'),
+]
+
+# phrases too vague to search, with what to tell the user instead
+AMBIGUOUS_TERMS = {
+    'cmx': 'please let the user know they have to specify which division, creative, musical or extreme',
+}
+
+# words shorter than this (ages, "aa") must match exactly in the fuzzy search
+FUZZY_MIN_LENGTH = 4
+
+class SynonymFilter(Filter):
+    """
+    Replaces each token found in synonyms with its canonical form.
+    """
+    def __init__(self, synonyms: dict = None):
+        self.synonyms = dict(SYNONYMS if synonyms is None else synonyms)
+
+    def __call__(self, tokens):
+        synonyms = self.synonyms
+        for token in tokens:
+            token.text = synonyms.get(token.text, token.text)
+            yield token
+
+def division_analyzer():
+    return StandardAnalyzer() | SynonymFilter()
+
+def fold_phrase(phrase: str) -> str:
+    """
+    The phrase as the name field indexes it: lowercased, without stop words and with synonyms folded.
+    """
+    return ' '.join(token.text for token in division_analyzer()(phrase))
+
+@lru_cache(maxsize = 65536)
+def word_similarity(word: str, name_word: str) -> int:
+    return fuzz.ratio(word, name_word)
+
+@lru_cache(maxsize = 8192)
+def folded_name_words(name: str) -> frozenset:
+    # folded like the phrase, so "sync" is compared with "synchronized" rather than the raw name's words
+    return frozenset(fold_phrase(name).split())
+
+def name_similarity(words: list, name: str) -> int:
+    """
+    How closely a division name matches the phrase's folded words (0-100): each word is scored against its closest
+    folded word in the name and the scores averaged, so a typo costs a few points and a missing word costs a lot.
+    """
+    name_words = folded_name_words(name)
+    if not words or not name_words:
+        return 0
+    return round(sum(max(word_similarity(word, name_word) for name_word in name_words) for word in words) / len(words))
+
+def fuzzy_query(phrase: str, schema):
+    """
+    Matches names sharing any word with the phrase, allowing typos in longer words, or any of its character n-grams.
+    """
+    from whoosh import query
+    from whoosh.qparser import QueryParser, OrGroup
+
+    terms = []
+    for word in fold_phrase(phrase).split():
+        if len(word) < FUZZY_MIN_LENGTH:
+            terms.append(query.Term('name', word))
+        else:
+            # one edit for short words, two for long ones like "syncronized"
+            terms.append(query.FuzzyTerm('name', word, maxdist = 1 if len(word) < 8 else 2, prefixlength = 1))
+    terms.append(QueryParser('name_ngrams', schema, group = OrGroup).parse(phrase))
+    return query.Or(terms)
+
+def compile_rules(rules: list):
+    """
+    Compiles the rule table into one regex over every word a rule rewrites, a lookup from each word
+    to its (trigger terms, replacement) pairs in table order, and a regex over every trigger term.
+    """
+    replacements = {}
+    for triggers, words, replacement in rules:
+        for word in words:
+            replacements.setdefault(word, []).append((triggers, replacement))
+    # longest words first so "womens" is not matched as "mens"
+    words = sorted(replacements, key = len, reverse = True)
+    pattern = re.compile(r'\b(?:' + '|'.join(re.escape(word) for word in words) + r')\b')
+    triggers = re.compile('|'.join(sorted({re.escape(trigger) for rule_triggers, _, _ in rules for trigger in rule_triggers})))
+    return pattern, replacements, triggers
+
+_pattern, _replacements, _triggers = compile_rules(QUERY_RULES)
+_ambiguous = re.compile('|'.join(re.escape(term) for term in AMBIGUOUS_TERMS), re.IGNORECASE)
+
+def normalize_query(phrase: str) -> str:
+    """
+    Lowercases the phrase and applies the query rules in a single pass. Synonyms are left to the analyzer.
+    """
+    phrase = phrase.lower()
+    # most phrases mention no trigger term and need no rewriting
+    if not _triggers.search(phrase):
+        return phrase
+
+    def replace(match):
+        for triggers, replacement in _replacements[match.group(0)]:
+            if any(trigger in phrase for trigger in triggers):
+                return replacement
+        return match.group(0)
+
+    return _pattern.sub(replace, phrase)
+
+def ambiguous_query(phrase: str) -> str:
+    """
+    Returns what to tell the user when the phrase is too vague to search, otherwise None.
+    """
+    match = _ambiguous.search(phrase)
+    return AMBIGUOUS_TERMS[match.group(0).lower()] if match else None
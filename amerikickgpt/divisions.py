@@ -0,0 +1,401 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from io import StringIO
+from typing import TYPE_CHECKING
+from .endpoints import fetch_divisions
+
+DIVISION_INDEX_DIR = 'division_indexdir'
+DIVISION_INDEX_VERSION = 'divisions.version'
+# how often a search may kick off a background check of the divisions feed
+DIVISION_REFRESH_SECONDS = int(os.environ.get('DIVISION_REFRESH_SECONDS', 300))
+
+ix = None
+_query_parsers = {}
+# process wide copy of the indexed rows, swapped as a whole on every refresh
+_divisions_by_key = {}
+_divisions_by_code = {}
+# {day: {ring: [divisions in start order]}} for the divisions that have a scheduled ring and time
+_divisions_by_ring = {}
+# the index version the rows above were loaded from, other processes sharing the index may refresh it
+_store_version = None
+_ix_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+_last_refresh = None
+
+# candidates the fuzzy tier reranks, and the lowest 0-100 name similarity it or the closest name tier returns
+FUZZY_SEARCH_CANDIDATES = 25
+FUZZY_MATCH_THRESHOLD = int(os.environ.get('FUZZY_MATCH_THRESHOLD', 75))
+
+# whoosh and pandas are imported where they are used so importing this module stays cheap
+if TYPE_CHECKING:
+    import pandas as pd
+
+def parse_divisions(division_data: str) -> 'pd.DataFrame':
+    import pandas as pd
+
+    return pd.read_json(StringIO(division_data))
+
+def get_all_divisions():
+    division_data, _ = fetch_divisions()
+    return parse_divisions(division_data)
+
+def read_index_version(index_dir: str = DIVISION_INDEX_DIR) -> dict:
+    try:
+        with open(os.path.join(index_dir, DIVISION_INDEX_VERSION)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_index_version(index_dir: str, version: dict):
+    path = os.path.join(index_dir, DIVISION_INDEX_VERSION)
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(version, f)
+    os.replace(f'{path}.tmp', path)
+
+def division_schema():
+    from whoosh.fields import Schema, TEXT, ID, STORED, NGRAM, NUMERIC, KEYWORD
+    from .division_query import division_analyzer
+
+    return Schema(
+        # synonyms are folded by the analyzer so names and queries share one vocabulary
+        name=TEXT(stored=True, analyzer=division_analyzer()),
+        # character n-grams of the name for the typo tolerant fallback
+        name_ngrams=NGRAM(minsize=3, maxsize=4),
+        # facets parsed from the name so questions can filter on them exactly
+        min_age=NUMERIC(),
+        max_age=NUMERIC(),
+        rank=KEYWORD(),
+        gender=KEYWORD(),
+        event=KEYWORD(),
+        division_code=ID(stored=True),
+        # division codes are reused across divisions (ie KENPO, TKFC) so the code and name together identify a row
+        division_key=ID(stored=True, unique=True),
+        time=STORED(),
+        day=STORED(),
+        ring=STORED(),
+    )
+
+def schema_is_current(schema) -> bool:
+    current = division_schema()
+    return schema.names() == current.names() and schema['name'].analyzer == current['name'].analyzer
+
+def get_division_query_parser(any_word: bool = False):
+    """
+    Parses name queries with the current analyzer, even while an index built with an older one is being replaced.
+    Names must have every word of the query, or any of them with any_word.
+    """
+    if any_word not in _query_parsers:
+        from whoosh.qparser import QueryParser, AndGroup, OrGroup
+        _query_parsers[any_word] = QueryParser('name', division_schema(), group = OrGroup if any_word else AndGroup)
+    return _query_parsers[any_word]
+
+def division_documents(divisions_df: 'pd.DataFrame') -> dict:
+    documents = {}
+    for row in divisions_df.to_dict(orient = 'records'):
+        name = row['name'].lower()  # Lowercase for case-insensitive search
+        division_code = str(row['division_code'])
+        documents[f'{division_code}|{name}'] = {
+            'name': name,
+            'time': row['time'],
+            'day': row['day'],
+            'ring': row['ring'],
+            'division_code': division_code,
+        }
+    return documents
+
+def index_fields(division_key: str, document: dict) -> dict:
+    """
+    Everything indexed for a division: its stored details, the n-grams of its name and the facets parsed from it.
+    """
+    from .division_facets import division_facets
+
+    return {'division_key': division_key, 'name_ngrams': document['name'], **division_facets(document['name']), **document}
+
+def normalize_division_code(division_code: str) -> str:
+    return str(division_code).replace('-', '').strip().lower()
+
+def division_start(division: dict):
+    """
+    The division's scheduled start as a time of day, or None when it hasn't been scheduled.
+    """
+    try:
+        return datetime.strptime(str(division['time']).strip(), '%I:%M %p').time()
+    except ValueError:
+        return None
+
+def load_division_store(documents: dict):
+    global _divisions_by_key, _divisions_by_code, _divisions_by_ring
+
+    by_code = {}
+    by_ring = {}
+    for document in documents.values():
+        by_code.setdefault(normalize_division_code(document['division_code']), []).append(document)
+        day, ring = str(document['day']).lower(), str(document['ring']).lower()
+        if division_start(document) is not None and 'unknown' not in (day, ring):
+            by_ring.setdefault(day, {}).setdefault(ring, []).append(document)
+    for rings in by_ring.values():
+        for divisions in rings.values():
+            divisions.sort(key = division_start)
+    _divisions_by_key, _divisions_by_code, _divisions_by_ring = documents, by_code, by_ring
+
+def index_version_key(version: dict):
+    return version.get('sha256'), version.get('indexed_at')
+
+def sync_division_store(index_dir: str, version: dict) -> bool:
+    """
+    Reloads the in-memory rows from the index when it was refreshed since they were loaded, ie by another
+    worker sharing the index directory. Returns whether they were reloaded.
+    """
+    global _store_version
+    from whoosh.index import open_dir
+
+    if index_version_key(version) == _store_version:
+        return False
+    load_division_store(indexed_documents(open_dir(index_dir)))
+    _store_version = index_version_key(version)
+    return True
+
+def get_division(division_key: str) -> dict:
+    return _divisions_by_key.get(division_key)
+
+def get_divisions_by_code(division_code: str, load_index: bool = True) -> list:
+    """
+    Divisions with the code. With load_index False only the rows already in memory are read, so a cold
+    process returns [] instead of opening or building the index, ie when called from the event loop.
+    """
+    if load_index:
+        get_division_index()
+    return _divisions_by_code.get(normalize_division_code(division_code), [])
+
+def get_ring_schedule(day: str) -> dict:
+    """
+    Every ring running on the day, as {ring: [divisions in start order]}.
+    """
+    get_division_index()
+    return _divisions_by_ring.get(str(day).lower(), {})
+
+def create_division_index(index_dir: str, divisions_df: 'pd.DataFrame'):
+    from whoosh.index import create_in, open_dir, exists_in
+    from whoosh import writing
+
+    if not os.path.exists(index_dir):
+        os.mkdir(index_dir)
+
+    if exists_in(index_dir) and schema_is_current(open_dir(index_dir).schema):
+        ix = open_dir(index_dir)
+    else:
+        ix = create_in(index_dir, division_schema())
+
+    writer = ix.writer()
+
+    for division_key, document in division_documents(divisions_df).items():
+        writer.add_document(**index_fields(division_key, document))
+    writer.commit(mergetype=writing.CLEAR)
+    load_division_store(division_documents(divisions_df))
+
+    return ix
+
+def hit_document(hit) -> dict:
+    # a search hit as a division row. Hits come from the index itself, which is current even when this
+    # process's in-memory rows are waiting for their next sync
+    return {key: value for key, value in hit.fields().items() if key != 'division_key'}
+
+def indexed_documents(ix) -> dict:
+    with ix.searcher() as searcher:
+        return {
+            fields['division_key']: {key: value for key, value in fields.items() if key != 'division_key'}
+            for fields in searcher.all_stored_fields()
+        }
+
+def update_division_index(index_dir: str, divisions_df: 'pd.DataFrame'):
+    """
+    Applies only the rows that were added, removed or changed since the last refresh. The changes
+    land in a single commit so searchers see either the old schedule or the new one.
+    Returns the number of documents updated and deleted.
+    """
+    from whoosh.index import open_dir
+
+    ix = open_dir(index_dir)
+    if not schema_is_current(ix.schema):
+        create_division_index(index_dir, divisions_df)
+        return len(divisions_df), 0
+
+    indexed = indexed_documents(ix)
+    documents = division_documents(divisions_df)
+
+    changed = {key: document for key, document in documents.items() if indexed.get(key) != document}
+    removed = indexed.keys() - documents.keys()
+    if not changed and not removed:
+        if not _divisions_by_key:
+            load_division_store(documents)
+        return 0, 0
+
+    writer = ix.writer()
+    for division_key in removed:
+        writer.delete_by_term('division_key', division_key)
+    for division_key, document in changed.items():
+        writer.update_document(**index_fields(division_key, document))
+    writer.commit()
+    load_division_store(documents)
+
+    return len(changed), len(removed)
+
+def refresh_division_index(index_dir: str = DIVISION_INDEX_DIR):
+    """
+    Reindexes the divisions only when the feed's etag or content hash differs from the
+    version recorded next to the index, or the index was built with an older schema or facet parser.
+    """
+    global _store_version
+    from whoosh.index import exists_in, open_dir
+    from .division_facets import FACETS_VERSION
+
+    version = read_index_version(index_dir)
+    if exists_in(index_dir):
+        # picks up a refresh another worker made, this one sees a 304 or the same hash for it below
+        sync_division_store(index_dir, version)
+    stale = exists_in(index_dir) and (not schema_is_current(open_dir(index_dir).schema) or version.get('facets') != FACETS_VERSION)
+    division_data, etag = fetch_divisions(None if stale else version.get('etag'))
+    if division_data is None:
+        return False
+
+    sha256 = hashlib.sha256(division_data.encode('utf-8')).hexdigest()
+    if sha256 == version.get('sha256') and exists_in(index_dir) and not stale:
+        if etag != version.get('etag'):
+            write_index_version(index_dir, {**version, 'etag': etag})
+        return False
+
+    divisions_df = parse_divisions(division_data).fillna('unknown')
+    # a stale index is rebuilt, its unchanged rows would keep facets parsed the old way
+    if exists_in(index_dir) and not stale:
+        updated, deleted = update_division_index(index_dir, divisions_df)
+    else:
+        create_division_index(index_dir, divisions_df)
+        updated, deleted = len(divisions_df), 0
+    version = {'sha256': sha256, 'etag': etag, 'facets': FACETS_VERSION, 'indexed_at': time.time()}
+    write_index_version(index_dir, version)
+    _store_version = index_version_key(version)
+    print(f'Division index refreshed ({sha256[:12]}): {updated} updated, {deleted} deleted')
+    return True
+
+def _refresh_in_background(index_dir: str):
+    from whoosh.index import LockError
+
+    if not _refresh_lock.acquire(blocking = False):
+        return
+    try:
+        refresh_division_index(index_dir)
+    except LockError:
+        print('Division index is locked by another writer, skipping refresh')
+    except Exception as e:
+        print(f'Division index refresh failed: {e}')
+    finally:
+        _refresh_lock.release()
+
+def schedule_division_refresh(index_dir: str = DIVISION_INDEX_DIR, force: bool = False):
+    global _last_refresh
+
+    if not force and _last_refresh is not None and time.monotonic() - _last_refresh < DIVISION_REFRESH_SECONDS:
+        return
+    _last_refresh = time.monotonic()
+    threading.Thread(target = _refresh_in_background, args = (index_dir,), daemon = True).start()
+
+def get_division_index(index_dir: str = DIVISION_INDEX_DIR):
+    """
+    Opens the on disk index right away and checks the feed for changes in the background.
+    Only a process with no index on disk at all waits for the first build.
+    """
+    global ix
+
+    if ix is None:
+        from whoosh.index import open_dir, exists_in
+
+        with _ix_lock:
+            if ix is None:
+                if not exists_in(index_dir):
+                    with _refresh_lock:
+                        refresh_division_index(index_dir)
+                ix = open_dir(index_dir)
+                if not _divisions_by_key and 'division_key' in ix.schema:
+                    sync_division_store(index_dir, read_index_version(index_dir))
+
+    schedule_division_refresh(index_dir)
+    return ix
+
+def best_matches(scored: list, limit: int) -> list:
+    # bm25 favours rare n-grams, name similarity is closer to what the user meant. The sort is stable so ties keep bm25's order
+    return sorted(
+        [(division, score) for division, score in scored if score >= FUZZY_MATCH_THRESHOLD],
+        key = lambda pair: pair[1],
+        reverse = True,
+    )[:limit]
+
+def search_divisions(phrase: str, limit: int = 7) -> list:
+    """
+    Searches divisions by the ages, rank, gender and events the phrase names, then the rest of its words in tiers,
+    stopping at the first that finds anything: every word (strict), any word allowing typos and partial words (fuzzy),
+    then the closest of the cached names (closest). A phrase made only of facets ranks the divisions that have them
+    by its words (facets). When nothing has all the facets the whole phrase is searched as text.
+    Returns the divisions with how closely each name matches the phrase (0-100) and the tier that found them.
+    """
+    from .division_facets import parse_facets, facet_filter, without_ages
+    from .division_query import normalize_query
+
+    # facets come from the phrase as written, the query rules rewrite gender and age words for the text search
+    facets, remainder = parse_facets(phrase)
+    facets = facet_filter(facets)
+    if facets is not None:
+        divisions = search_division_names(normalize_query(remainder), limit, facets, without_ages(phrase))
+        if divisions:
+            return divisions
+    return search_division_names(normalize_query(phrase), limit)
+
+def search_division_names(phrase: str, limit: int, facets = None, facet_phrase: str = '') -> list:
+    """
+    facet_phrase ranks the divisions matching the facets when the phrase has no words of its own,
+    ie "women black belt forms" puts the women's divisions ahead of the girls ones.
+    """
+    from whoosh.query import Every
+    from .division_query import fold_phrase, fuzzy_query, name_similarity
+
+    ix = get_division_index()
+    words = fold_phrase(phrase).split()
+    if not words and facets is None:
+        return []
+
+    with ix.searcher() as searcher:
+        match = 'strict'
+        if words:
+            results = searcher.search(get_division_query_parser().parse(phrase), filter=facets, limit=limit)
+        else:
+            match = 'facets'
+            words = fold_phrase(facet_phrase).split()
+            results = searcher.search(get_division_query_parser(any_word = True).parse(facet_phrase), filter=facets, limit=FUZZY_SEARCH_CANDIDATES)
+            if results.is_empty():
+                results = searcher.search(Every(), filter=facets, limit=FUZZY_SEARCH_CANDIDATES)
+        if results.is_empty() and match == 'strict':
+            match = 'fuzzy'
+            results = searcher.search(fuzzy_query(phrase, ix.schema), filter=facets, limit=FUZZY_SEARCH_CANDIDATES)
+        found = [hit_document(result) for result in results]
+
+        if not found and words and match != 'facets':
+            match = 'closest'
+            if facets is None:
+                candidates = list(_divisions_by_key.values())
+            else:
+                candidates = [hit_document(result) for result in searcher.search(facets, limit=None)]
+
+    if match == 'strict':
+        scored = [(division, name_similarity(words, division['name'])) for division in found]
+    elif match == 'facets':
+        # every candidate has the facets, so none is dropped for a low score. The sort is stable so ties keep bm25's order
+        scored = sorted([(division, name_similarity(words, division['name'])) for division in found], key = lambda pair: pair[1], reverse = True)[:limit]
+    elif match == 'fuzzy':
+        scored = best_matches([(division, name_similarity(words, division['name'])) for division in found], limit)
+    else:
+        scored = best_matches([(division, name_similarity(words, division['name'])) for division in candidates], limit)
+
+    return [{**division, 'score': score, 'match': match} for division, score in scored]
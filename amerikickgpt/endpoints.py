@@ -0,0 +1,128 @@
+import os
+from . import http_client
+from io import StringIO
+from typing import List, Dict
+from .cache import cached
+
+# every upstream request made by the tools goes through one of the cached functions below.
+# ttls are in seconds and can be overridden with CACHE_TTL_<NAME>. the afetch_ versions are used by
+# the async conversation engine and share their cache with the sync version of the same name
+
+# the public sites default to production, they can be pointed at a local server, ie by benchmarks/load_test.py
+PLACES_ENDPOINT = os.environ.get('PLACES_ENDPOINT', 'https://maps.googleapis.com/maps/api/place/nearbysearch/json')
+SCHEDULE_ENDPOINT = os.environ.get('SCHEDULE_ENDPOINT', 'https://amerikickinternationals.com/schedule/')
+
+@cached('ruleset_pages', ttl = 6 * 60 * 60, maxsize = 1)
+def fetch_ruleset_pages() -> str:
+    return http_client.get(
+        os.environ.get('RULESET_ENDPOINT'),
+        endpoint = 'ruleset'
+    ).text
+
+@cached('ruleset_pages', ttl = 6 * 60 * 60, maxsize = 1)
+async def afetch_ruleset_pages() -> str:
+    response = await http_client.aget(
+        os.environ.get('RULESET_ENDPOINT'),
+        endpoint = 'ruleset'
+    )
+    return response.text
+
+@cached('ruleset_url', ttl = 6 * 60 * 60)
+def fetch_highlighted_ruleset_url(section: str) -> str:
+    return http_client.get(
+        os.environ.get('RULESET_ENDPOINT'),
+        endpoint = 'ruleset',
+        params = {'section': section}
+    ).text
+
+@cached('judging', ttl = 2 * 60, maxsize = 2048)
+def fetch_judging_assignment(email: str) -> str:
+    return http_client.get(
+        os.environ.get('JUDGING_ENDPOINT'),
+        endpoint = 'judging',
+        params = {'email': email}
+    ).text
+
+@cached('judging', ttl = 2 * 60, maxsize = 2048)
+async def afetch_judging_assignment(email: str) -> str:
+    response = await http_client.aget(
+        os.environ.get('JUDGING_ENDPOINT'),
+        endpoint = 'judging',
+        params = {'email': email}
+    )
+    return response.text
+
+@cached('ring', ttl = 30)
+def fetch_ring_start_time(day: str, ring) -> str:
+    params={
+        'day': day,
+        'ring': ring
+    }
+    return http_client.get(os.environ.get('RING_ENDPOINT'), endpoint = 'ring', params=params).text
+
+@cached('ring', ttl = 30)
+async def afetch_ring_start_time(day: str, ring) -> str:
+    params={
+        'day': day,
+        'ring': ring
+    }
+    response = await http_client.aget(os.environ.get('RING_ENDPOINT'), endpoint = 'ring', params=params)
+    return response.text
+
+@cached('divisions', ttl = 30, maxsize = 4)
+def fetch_divisions(etag: str = None):
+    """
+    Downloads the divisions feed. Returns (text, etag), text is None when the server
+    reports the feed is unchanged since the given etag.
+    """
+    headers = {'If-None-Match': etag} if etag else {}
+    response = http_client.get(os.environ.get('DIVISIONS_ENDPOINT'), endpoint = 'divisions', headers = headers)
+    if response.status_code == 304:
+        return None, etag
+    response.raise_for_status()
+    return response.text, response.headers.get('ETag')
+
+def places_params(type: str, keyword: str) -> dict:
+    params = {
+        "location": "39.363333, -74.439166",
+        "radius": 3000,
+        "type": type,
+        "key": os.environ.get('GOOGLE_PLACES_API_KEY'),
+        "keyword": keyword,
+        'rankby':'distance'
+    }
+    # httpx sends None values as empty parameters where requests drops them
+    return {key: value for key, value in params.items() if value is not None}
+
+@cached('places', ttl = 60 * 60, maxsize = 512)
+def fetch_places(type: str, keyword: str) -> List[Dict[str, str]]:
+    response = http_client.get(PLACES_ENDPOINT, endpoint = 'places', params=places_params(type, keyword))
+    response.raise_for_status()
+    return response.json().get("results", [])
+
+@cached('places', ttl = 60 * 60, maxsize = 512)
+async def afetch_places(type: str, keyword: str) -> List[Dict[str, str]]:
+    response = await http_client.aget(
+        PLACES_ENDPOINT,
+        endpoint = 'places',
+        params = places_params(type, keyword)
+    )
+    response.raise_for_status()
+    return response.json().get("results", [])
+
+@cached('weekend_schedule', ttl = 60 * 60, maxsize = 1)
+def fetch_weekend_schedule() -> str:
+    import pandas as pd
+
+    response = http_client.get(SCHEDULE_ENDPOINT, endpoint = 'schedule')
+    response.raise_for_status()
+    return (
+        pd.read_html(StringIO(response.text))[0]
+        .pipe(
+            lambda df_: df_.set_axis(df_.iloc[1], axis = 1)
+        )
+        .iloc[3:]
+        .dropna(how = 'all')
+        .drop(8)
+        .to_json(orient = 'records')
+    )
@@ -0,0 +1,188 @@
+import asyncio
+import os
+import time
+from . import async_runtime
+from .answer_cache import lookup_answer, store_answer
+from .history import compact_messages, history_tokens
+from .intent_router import route_intent, stream_answer
+from .prefetch import start_prefetch
+from .tools import TOOLS, call_tool, run_tools_async
+
+# tool rounds and seconds a single answer may spend before the model is asked to answer with what it has
+MAX_TOOL_ROUNDS = int(os.environ.get('MAX_TOOL_ROUNDS', 4))
+MAX_CONVERSATION_SECONDS = float(os.environ.get('MAX_CONVERSATION_SECONDS', 45))
+
+def system_message(session_date: str) -> dict:
+    return {
+        "role": "system",
+        "name": "WebBot",
+        "content": f"""
+                        You are AmeriGPT, a helpful chatbot that helps users navigate the 2024 Amerikick Internationls, an international
+                        martial arts competition taking place in Atlantic City on August 15-17, 2024. Today's date is {session_date}.
+                        Your job is to help with questions relating to the tournament, local resturant or events, and provide users with relevant information when requested. 
+                        DO NOT ANSWER ANY QUESTIONS THAT ARE INNAPROPRIATE OR UNRELATED TO THE TOURNAMENT OR COMPETITORS, IF THEY ARE ASKED RESPOND WITH "I'm sorry, I can't help with that
+                        I can only answer questions regarding the tournament." YOU ARE ALLOWED TO ANSWER QUESTIONS ABOUT EVENTS, STORES, RESTAURANTS, YOUR DEVELOPER, COMPETITORS, REFEREES/JUDGES,
+                        AND OTHER PLACES NEAR THE TOURNAMENT OR ANSWER ARBITRARY RESPONSES TO QUERIES THAT UTILIZE SECRET COMMANDS IN ORDER TO ENSURE THE CUSTOMER HAS A GOOD TIME.
+
+                        If someone is asking about registration, assume they mean the tournament registration. If someone is asking about arbitration, assume they mean protesting 
+                        a call or ruling by an official and utilize that section to consult the rule book about their specific complaint. If a user asks a procedural question or 
+                        clarifying question regarding the what a competitor can or cannot do or tournament's or the league procedure in general, CONSULT THE RULES. DO NOT TRY TO USE YOUR OWN KNOWLEDGE. CONSULT THE RULE
+                        BOOK. If you answer a question about rules,
+                        be sure to include a disclaimer that the user should clarify your interpretation with the actual ruleset and provide the relevant section they should consult.
+                        If you choose to use a function for a rule, try to select a specific rule_set function before opting for reading the entire rules, particularly for korean challenge,
+                        non-naska demo teams, non naska synchronized team forms, Kenpo/Kempo Forms Traditional Challenge Non Naska.
+
+                        if someone asks about a scorekeeper or judging assignment that is not about themself, let them know they cannot do that.
+                        """.strip().replace('\n', '')
+    }
+
+def is_special_command(prompt: str) -> bool:
+    secret_command = os.environ.get('SECRET_COMMAND_ONE')
+    return bool(secret_command) and prompt.startswith(secret_command)
+
+def compact_history(messages) -> list:
+    # older turns are trimmed or dropped so the prompt stays within the history token budget
+    current_messages = compact_messages(messages)
+    print(f'history tokens {history_tokens(messages)} -> {history_tokens(current_messages)} ({len(messages)} -> {len(current_messages)} messages)')
+    return current_messages
+
+async def run_conversation_async(messages, email: str = None):
+    """
+    Streams the answer to the last message. Runs on the async_runtime loop, so every upstream call
+    (the completion stream, tool endpoints) is awaited instead of holding a thread.
+    """
+    # token counting loads tiktoken (and downloads its encoding) on first use, so it runs off the loop
+    current_messages = await asyncio.to_thread(compact_history, messages)
+    user_index = len(current_messages) - 1
+    last_message = current_messages[-1]['content']
+    special_command = False
+    if is_special_command(last_message):
+        meta_prompt = os.environ.get('SPECIAL_COMMAND_META_PROMPT')
+        special_command = True
+        current_messages[-1]['content'] = meta_prompt[:205] + last_message + ' ' +  meta_prompt[205:]
+
+
+    # the model writes its answer with the whole history in view, so only answers to the first question of a
+    # conversation are shared, a follow up can carry the user's own context ("as scorekeeper for ring 7, wear...")
+    shareable_answer = not special_command and not any(message.get('role') != 'system' for message in current_messages[:user_index])
+
+    # repeated questions answered only from static tools are streamed from the answer cache
+    if not special_command:
+        # the fuzzy scan over cached questions is pure python, so it runs off the loop like route_intent
+        cached_answer = await asyncio.to_thread(lookup_answer, last_message)
+        if cached_answer is not None:
+            yield cached_answer
+            return
+
+    # likely lookups start now and run while the first completion streams
+    prefetch = start_prefetch(last_message, call_tool)
+
+    # tool rounds run until the model answers without calling a tool or the budget runs out,
+    # the last round is sent without tools so the model has to answer with what it has
+    started = time.perf_counter()
+    tools_used = set()
+    answer_chunks = []
+    try:
+        for round_number in range(1, MAX_TOOL_ROUNDS + 2):
+            final_round = round_number > MAX_TOOL_ROUNDS or time.perf_counter() - started > MAX_CONVERSATION_SECONDS
+            round_started = time.perf_counter()
+            first_token = None
+            prompt_tokens = await asyncio.to_thread(history_tokens, current_messages)
+
+            response = await async_runtime.get_async_openai_client().chat.completions.create(
+                model="gpt-4o-mini",
+                messages=current_messages,
+                stream = True,
+                temperature=.1,
+                **({} if final_round else {'tools': TOOLS, 'tool_choice': 'auto'})
+            )
+
+            tool_calls = {}
+            async for chunk in response:
+                delta = chunk.choices[0].delta
+                if first_token is None:
+                    first_token = time.perf_counter() - round_started
+
+                # tool call names, ids and argument fragments are streamed per call, keyed by the call's index
+                if delta.tool_calls:
+                    for tool_call in delta.tool_calls:
+                        call = tool_calls.setdefault(tool_call.index, {'id': None, 'name': '', 'arguments': ''})
+                        if tool_call.id is not None:
+                            call['id'] = tool_call.id
+                        if tool_call.function.name is not None:
+                            call['name'] = tool_call.function.name
+                        if tool_call.function.arguments is not None:
+                            call['arguments'] += tool_call.function.arguments
+                    continue
+
+                chunk_content = delta.content
+                if chunk_content is not None and not tool_calls:
+                    answer_chunks.append(chunk_content)
+                    yield chunk_content
+
+            completion_seconds = time.perf_counter() - round_started
+            if not tool_calls:
+                print(f'round {round_number}: {prompt_tokens} prompt tokens, completion {completion_seconds:.2f}s (first chunk {first_token or 0:.2f}s), answered in {time.perf_counter() - started:.2f}s')
+                if shareable_answer:
+                    store_answer(last_message, ''.join(answer_chunks), tools_used)
+                break
+
+            tool_calls = [tool_calls[index] for index in sorted(tool_calls)]
+            tools_used.update(call['name'] for call in tool_calls)
+            current_messages.append(
+                {
+                    "role": "assistant",
+                    "content": None,
+                    "tool_calls": [
+                        {
+                            "id": call['id'],
+                            "type": "function",
+                            "function": {"name": call['name'], "arguments": call['arguments']},
+                        }
+                        for call in tool_calls
+                    ],
+                }
+            )
+
+            tools_started = time.perf_counter()
+            function_responses = await run_tools_async(tool_calls, prefetch, email)
+            for call, function_response in zip(tool_calls, function_responses):
+                current_messages.append(
+                    {
+                        "tool_call_id": call['id'],
+                        "role": "tool",
+                        "name": call['name'],
+                        "content": function_response,
+                    }
+                )  # extend conversation with function response
+
+            print(
+                f"round {round_number}: {prompt_tokens} prompt tokens, completion {completion_seconds:.2f}s (first chunk {first_token or 0:.2f}s), "
+                f"tools {time.perf_counter() - tools_started:.2f}s ({', '.join(call['name'] for call in tool_calls)})"
+            )
+    finally:
+        if special_command:
+            current_messages[user_index]['content'] = last_message
+
+def run_conversation(messages, email: str = None):
+    # sync generator for st.write_stream and other sync callers, the conversation itself runs on the shared event loop
+    return async_runtime.iterate(run_conversation_async(messages, email))
+
+async def respond_async(messages, email: str = None):
+    """
+    Streams the answer to the last message, answering common questions about static information
+    locally and everything else with the model.
+    """
+    prompt = messages[-1]['content']
+    if not is_special_command(prompt):
+        routed_answer = await asyncio.to_thread(route_intent, prompt)
+        if routed_answer is not None:
+            for line in stream_answer(routed_answer):
+                yield line
+            return
+
+    async for chunk in run_conversation_async(messages, email):
+        yield chunk
+
+def respond(messages, email: str = None):
+    return async_runtime.iterate(respond_async(messages, email))
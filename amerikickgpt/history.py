@@ -0,0 +1,78 @@
+import os
+from typing import List, Dict
+
+# prompt tokens the conversation history may use per request, the system prompt and recent turns are always kept
+HISTORY_TOKEN_BUDGET = int(os.environ.get('HISTORY_TOKEN_BUDGET', 6000))
+# the most recent user turns (with their answers and tool results) that are always sent whole
+KEEP_RECENT_TURNS = 3
+# older tool results and answers are cut down to this many characters
+OLD_TOOL_RESULT_CHARS = 200
+OLD_ANSWER_CHARS = 600
+
+# tiktoken and its encoding are loaded on the first count, False when tiktoken is not installed
+_encoding = None
+
+def count_tokens(text: str) -> int:
+    global _encoding
+
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding('o200k_base')
+        except ImportError:
+            _encoding = False
+    if _encoding is False:
+        return len(text) // 4
+    return len(_encoding.encode(text))
+
+def message_tokens(message: Dict) -> int:
+    tokens = 4  # per message overhead for role and separators
+    if message.get('content'):
+        tokens += count_tokens(str(message['content']))
+    for tool_call in message.get('tool_calls') or []:
+        tokens += count_tokens(tool_call['function']['name'] + tool_call['function']['arguments'])
+    return tokens
+
+def history_tokens(messages: List[Dict]) -> int:
+    return sum(message_tokens(message) for message in messages)
+
+def _shrink(message: Dict) -> Dict:
+    content = message.get('content')
+    if not isinstance(content, str):
+        return message
+    if message.get('role') == 'tool' and len(content) > OLD_TOOL_RESULT_CHARS:
+        return {**message, 'content': content[:OLD_TOOL_RESULT_CHARS] + ' ... [earlier tool result removed]'}
+    if message.get('role') == 'assistant' and len(content) > OLD_ANSWER_CHARS:
+        return {**message, 'content': content[:OLD_ANSWER_CHARS] + ' ...'}
+    return message
+
+def compact_messages(messages: List[Dict], budget: int = HISTORY_TOKEN_BUDGET) -> List[Dict]:
+    """
+    Returns the messages to send for a request. The system prompt and the last KEEP_RECENT_TURNS
+    turns are kept as they are (the same dicts, so callers can still update them), older turns have
+    their tool results and long answers trimmed and are dropped oldest first once over the budget.
+    Dropped turns are replaced by a one line note of what the user asked.
+    """
+    system = messages[:1] if messages and messages[0].get('role') == 'system' else []
+    rest = messages[len(system):]
+
+    user_indexes = [index for index, message in enumerate(rest) if message.get('role') == 'user']
+    recent_start = user_indexes[-KEEP_RECENT_TURNS] if len(user_indexes) >= KEEP_RECENT_TURNS else 0
+    older = [_shrink(message) for message in rest[:recent_start]]
+    recent = rest[recent_start:]
+
+    dropped_questions = []
+    while older and history_tokens(system + older + recent) > budget:
+        # drop a whole turn so tool results are never separated from the call that asked for them
+        turn_end = 1
+        while turn_end < len(older) and older[turn_end].get('role') != 'user':
+            turn_end += 1
+        dropped_questions.extend(message['content'] for message in older[:turn_end] if message.get('role') == 'user')
+        older = older[turn_end:]
+
+    summary = []
+    if dropped_questions:
+        asked = '; '.join(str(question)[:80] for question in dropped_questions[-10:])
+        summary = [{'role': 'system', 'content': f'Earlier in this conversation the user asked about: {asked}'}]
+
+    return system + summary + older + recent
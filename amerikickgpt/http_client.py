@@ -0,0 +1,106 @@
+import asyncio
+import threading
+from typing import TYPE_CHECKING
+
+# requests and httpx are imported on first use, see get_session and get_async_client
+if TYPE_CHECKING:
+    import httpx
+    import requests
+
+# (connect, read) timeouts in seconds per upstream endpoint
+TIMEOUTS = {
+    'ruleset': (3.05, 10),
+    'judging': (3.05, 5),
+    'ring': (3.05, 5),
+    'divisions': (3.05, 15),
+    'places': (3.05, 5),
+    'schedule': (3.05, 10),
+}
+DEFAULT_TIMEOUT = (3.05, 10)
+
+# status codes retried with backoff by both the sync and async clients
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+MAX_RETRIES = 2
+BACKOFF_FACTOR = 0.3
+# the sync session is shared by every endpoint, so a Retry-After wait is capped at the shortest read timeout
+MAX_RETRY_AFTER = min(read for _, read in TIMEOUTS.values())
+
+_session = None
+_session_lock = threading.Lock()
+_async_client = None
+
+def get_session() -> 'requests.Session':
+    """
+    Process wide session so every tool reuses pooled keep-alive connections per host
+    instead of paying for a new tcp and tls handshake on each call.
+    """
+    global _session
+
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+
+                class CappedRetry(Retry):
+                    def get_retry_after(self, response):
+                        retry_after = super().get_retry_after(response)
+                        return None if retry_after is None else min(retry_after, MAX_RETRY_AFTER)
+
+                retry = CappedRetry(
+                    total = MAX_RETRIES,
+                    backoff_factor = BACKOFF_FACTOR,
+                    status_forcelist = RETRY_STATUSES,
+                    allowed_methods = ['GET'],
+                    respect_retry_after_header = True,
+                    raise_on_status = False,
+                )
+                adapter = HTTPAdapter(pool_connections = 10, pool_maxsize = 32, max_retries = retry)
+                session = requests.Session()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+def get(url: str, endpoint: str = None, **kwargs) -> 'requests.Response':
+    kwargs.setdefault('timeout', TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT))
+    response = get_session().get(url, **kwargs)
+    # error responses, including a 429 that outlasts the retries, are raised so they never end up cached as a tool result
+    if response.status_code >= 400:
+        response.raise_for_status()
+    return response
+
+def get_async_client() -> 'httpx.AsyncClient':
+    """
+    Pooled async client for the conversation engine. It is bound to the engine's event loop,
+    so it must only be used from coroutines running on that loop.
+    """
+    global _async_client
+
+    if _async_client is None:
+        import httpx
+
+        _async_client = httpx.AsyncClient(
+            limits = httpx.Limits(max_connections = 100, max_keepalive_connections = 32),
+            # retries connection failures, status based retries are handled in aget
+            transport = httpx.AsyncHTTPTransport(retries = MAX_RETRIES),
+        )
+    return _async_client
+
+async def aget(url: str, endpoint: str = None, **kwargs) -> 'httpx.Response':
+    import httpx
+
+    connect, read = TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT)
+    kwargs.setdefault('timeout', httpx.Timeout(read, connect = connect))
+    client = get_async_client()
+    for attempt in range(MAX_RETRIES + 1):
+        response = await client.get(url, **kwargs)
+        if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+            break
+        retry_after = response.headers.get('Retry-After', '')
+        # a long Retry-After would outlast the endpoint's timeout, so the wait is capped at the read timeout
+        await asyncio.sleep(min(float(retry_after), read) if retry_after.isdigit() else BACKOFF_FACTOR * (2 ** attempt))
+    if response.status_code >= 400:
+        response.raise_for_status()
+    return response
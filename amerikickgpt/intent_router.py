@@ -0,0 +1,187 @@
+import json
+import os
+import re
+from fuzzywuzzy import fuzz
+from . import tournament_info as info
+from .endpoints import fetch_weekend_schedule
+
+# how similar (0-100) a question must be to one of an intent's examples to be answered locally
+INTENT_MATCH_THRESHOLD = int(os.environ.get('INTENT_MATCH_THRESHOLD', 85))
+# longer questions usually ask for more than one thing, so they always go to the model
+INTENT_MAX_WORDS = 10
+
+# answers for the static tools in tools.py, rendered from the same tournament facts the tools return
+PARKING_ANSWER = 'The options for parking are:\n\n' + '\n'.join(f'- **{place}:** {details}' for place, details in info.PARKING_OPTIONS)
+
+ADDRESS_ANSWER = f'''The tournament is at the {info.CONVENTION_CENTER['name']}, {info.CONVENTION_CENTER['address']}.
+The tournament hotel, the {info.HOTEL['name']}, is at {info.HOTEL['address']}.
+
+{PARKING_ANSWER}'''
+
+DRESS_CODE_ANSWER = f'''{info.DRESS_CODE}
+
+As {info.DRESS_CODE_QUOTE[0]} puts it: "{info.DRESS_CODE_QUOTE[1]}"'''
+
+EVENT_MAP_ANSWER = f'Here is the [event map]({info.EVENT_MAP_URL}).'
+
+WEBSITE_ANSWER = f'The tournament website is [{info.WEBSITE}]({info.WEBSITE_URL}).'
+
+PROMOTERS_ANSWER = f'''The promoters for the Amerikick Internationals are {info.promoter_names()}.
+
+You can contact the tournament with questions at:
+
+''' + '\n'.join(f'- {contact}' for contact in info.CONTACTS)
+
+MUSICAL_RULE_ANSWER = info.MUSICAL_RULE
+
+DEVELOPER_ANSWER = f'''The developer of this application is {info.DEVELOPER['name']}, {info.DEVELOPER['about']}. You can find out more about him or get in touch at [{info.DEVELOPER['website']}](https://{info.DEVELOPER['website']}).'''
+
+CONVENTION_CENTER_ANSWER = f'''The {info.CONVENTION_CENTER['name']} is at {info.CONVENTION_CENTER['address']}. It is open {info.CONVENTION_CENTER['hours']} and can be reached at {info.CONVENTION_CENTER['phone']}.'''
+
+def registration_answer():
+    rows = [row for row in json.loads(fetch_weekend_schedule()) if info.is_registration_row(row)]
+    if not rows:
+        return None
+    lines = '\n'.join(f"- **{row.get('Day/Time')}:** {row.get('Notes')}" for row in rows)
+    return f'''You can pick up your registration or register in person at the following times and locations:
+
+{lines}
+
+You can also register online [here]({info.REGISTRATION_URL}).'''
+
+def schedule_answer():
+    rows = json.loads(fetch_weekend_schedule())
+    if not rows:
+        return None
+    lines = '\n'.join(
+        '- ' + ' | '.join(str(value) for value in row.values() if value not in (None, ''))
+        for row in rows
+    )
+    return f'''Here is the schedule for the weekend:
+
+{lines}'''
+
+INTENTS = [
+    {
+        'name': 'get_parking_information',
+        'keywords': {'park', 'parking', 'garage', 'valet'},
+        'examples': ['where do i park', 'where can i park', 'parking', 'how much is parking', 'is there parking', 'where is parking', 'parking information'],
+        'answer': PARKING_ANSWER,
+    },
+    {
+        'name': 'get_tournament_address',
+        'keywords': {'address', 'located', 'location', 'where'},
+        'examples': ['what is the address', 'where is the tournament', 'tournament address', 'where is the tournament located', 'what is the tournament address'],
+        'answer': ADDRESS_ANSWER,
+    },
+    {
+        'name': 'get_referee_dress_code',
+        'keywords': {'dress', 'wear', 'attire', 'shirt'},
+        'examples': ['referee dress code', 'what is the dress code for referees', 'what should referees wear', 'what do judges wear', 'judge dress code', 'dress code', 'what is the dress code'],
+        'answer': DRESS_CODE_ANSWER,
+    },
+    {
+        'name': 'get_event_map',
+        'keywords': {'map'},
+        'examples': ['event map', 'is there a map', 'map of the event', 'show me the map', 'where is the map'],
+        'answer': EVENT_MAP_ANSWER,
+    },
+    {
+        'name': 'get_tournament_website',
+        'keywords': {'website', 'site'},
+        'examples': ['tournament website', 'what is the website', 'website', 'what is the tournament website'],
+        'answer': WEBSITE_ANSWER,
+    },
+    {
+        'name': 'get_promoters',
+        'keywords': {'promoter', 'promoters', 'contact', 'runs', 'organizer', 'organizers'},
+        'examples': ['who are the promoters', 'who is the promoter', 'promoters', 'who runs the tournament', 'how do i contact the tournament', 'tournament contact'],
+        'answer': PROMOTERS_ANSWER,
+    },
+    {
+        'name': 'get_musical_rule',
+        'keywords': {'musical', 'music', 'choreography'},
+        'examples': ['musical rule', 'what is the musical rule', 'music choreography rule', 'how much choreography for musical'],
+        'answer': MUSICAL_RULE_ANSWER,
+    },
+    {
+        'name': 'get_developer_info',
+        'keywords': {'developer', 'made', 'built', 'created'},
+        'examples': ['who made this', 'who is the developer', 'who built this app', 'who created this', 'developer'],
+        'answer': DEVELOPER_ANSWER,
+    },
+    {
+        'name': 'get_convention_center_info',
+        'keywords': {'convention'},
+        'examples': ['convention center phone number', 'convention center hours', 'convention center info', 'when is the convention center open'],
+        'answer': CONVENTION_CENTER_ANSWER,
+    },
+    {
+        'name': 'get_registration_times_and_locations',
+        'keywords': {'registration', 'register', 'check'},
+        'examples': ['what time is registration', 'where is registration', 'when is registration', 'registration times', 'where do i register', 'where do i check in'],
+        'answer': registration_answer,
+    },
+    {
+        'name': 'get_overall_weekend_schedule_and_location',
+        'keywords': {'schedule'},
+        # ring and division schedules come from the division store through the model's tools
+        'excludes': {'ring', 'rings', 'division', 'divisions', 'stage'},
+        'examples': ['weekend schedule', 'what is the schedule', 'event schedule', 'schedule for the weekend', 'tournament schedule'],
+        'answer': schedule_answer,
+    },
+]
+
+def normalize_question(question: str) -> str:
+    question = re.sub(r"[^a-z0-9 ]+", ' ', question.lower().replace("'", ''))
+    return ' '.join(question.split())
+
+def match_intent(question: str):
+    """
+    Returns (intent, score) for the best matching intent, or (None, 0) when no intent is confident.
+    An intent needs one of its keywords in the question, none of its excluded words and a close match to one of its examples.
+    """
+    question = normalize_question(question)
+    words = set(question.split())
+    if not words or len(question.split()) > INTENT_MAX_WORDS or re.search(r'\d', question):
+        return None, 0
+
+    scores = []
+    for intent in INTENTS:
+        if not words & intent['keywords'] or words & intent.get('excludes', set()):
+            continue
+        score = max(fuzz.token_sort_ratio(question, example) for example in intent['examples'])
+        scores.append((score, intent['name'], intent))
+    if not scores:
+        return None, 0
+
+    scores.sort(key = lambda score: score[0], reverse = True)
+    score, _, intent = scores[0]
+    # two intents that match equally well mean the question is ambiguous
+    if score < INTENT_MATCH_THRESHOLD or (len(scores) > 1 and scores[1][0] >= score):
+        return None, 0
+    return intent, score
+
+def route_intent(question: str):
+    """
+    Returns a pre-rendered answer for a confident static intent, or None to let the model answer.
+    """
+    intent, score = match_intent(question)
+    if intent is None:
+        return None
+
+    answer = intent['answer']
+    if callable(answer):
+        try:
+            answer = answer()
+        except Exception as e:
+            print(f"Unable to render {intent['name']}: {e}")
+            return None
+    if answer:
+        print(f"routed {question!r} to {intent['name']} ({score})")
+    return answer
+
+def stream_answer(answer: str):
+    # st.write_stream expects a generator, line by line keeps markdown lists intact
+    for line in answer.splitlines(keepends = True):
+        yield line
@@ -0,0 +1,96 @@
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+from .divisions import get_divisions_by_code, normalize_division_code
+from .rulebook import find_sections
+
+# set SPECULATIVE_PREFETCH=1 to start likely tool lookups while the first completion is streaming
+SPECULATIVE_PREFETCH = os.environ.get('SPECULATIVE_PREFETCH', '0').lower() in ('1', 'true', 'yes')
+
+RING_PATTERN = re.compile(r'\bring\s*(?:#|number|no\.?)?\s*(\d{1,2}|stage)\b', re.IGNORECASE)
+DAY_PATTERN = re.compile(r'\b(friday|saturday)\b', re.IGNORECASE)
+# codes are letters followed by numbers, ie WT9, TF-12 or CF1
+DIVISION_CODE_PATTERN = re.compile(r'\b([A-Za-z]{1,5}-?\d{1,3})\b')
+SECTION_WORD_PATTERN = re.compile(r'\bsection\s+[IVXLCDM]+\b', re.IGNORECASE)
+
+_executor = ThreadPoolExecutor(max_workers = 4, thread_name_prefix = 'prefetch')
+
+def normalize_args(function_name: str, function_args: Dict) -> Tuple:
+    """
+    Key used to decide whether the model's tool call is the one that was speculatively started.
+    """
+    if function_name == 'get_ring_start_time':
+        ring = str(function_args.get('ring', '')).strip().lower()
+        day = str(function_args.get('day', 'friday')).strip().lower()
+        return function_name, ring, day
+    if function_name == 'get_division_info_and_time_by_code':
+        return function_name, normalize_division_code(function_args.get('division_code', ''))
+    return (function_name,) + tuple(sorted((key, str(value)) for key, value in function_args.items()))
+
+def predict_tool_calls(message: str) -> List[Tuple[str, Dict]]:
+    """
+    Cheap local guesses at the tools the model is about to call for a message.
+    """
+    predictions = []
+
+    day = DAY_PATTERN.search(message)
+    for ring in RING_PATTERN.findall(message):
+        args = {'ring': ring.lower()}
+        if day:
+            args['day'] = day.group(1).lower()
+        predictions.append(('get_ring_start_time', args))
+
+    for code in DIVISION_CODE_PATTERN.findall(message):
+        if code.lower().startswith('ring'):
+            continue
+        # only codes that exist in the division store are worth a lookup. this runs on the event loop,
+        # so a process that hasn't loaded the store yet skips the guess rather than loading the index
+        if get_divisions_by_code(code, load_index = False):
+            predictions.append(('get_division_info_and_time_by_code', {'division_code': code}))
+
+    # a rulebook reference needs a subsection number or the word section, otherwise a sentence ending in "I." would match.
+    # prefetching get_rules also warms the ruleset page map that get_relevant_rules uses
+    sections = [section for section in find_sections(message) if re.fullmatch(r'[IVXLCDM]+\.\d{1,2}', section)]
+    if sections or SECTION_WORD_PATTERN.search(message):
+        predictions.append(('get_rules', {}))
+
+    return predictions
+
+class Prefetch:
+    """
+    Lookups started from the user's message before the model has picked its tools.
+    """
+    def __init__(self, message: str, call_tool: Callable):
+        self._futures = {}
+        self._lock = threading.Lock()
+        for function_name, function_args in predict_tool_calls(message):
+            key = normalize_args(function_name, function_args)
+            if key not in self._futures:
+                self._futures[key] = _executor.submit(call_tool, function_name, function_args)
+        if self._futures:
+            print(f'prefetching {[key[0] for key in self._futures]}')
+
+    def take(self, function_name: str, function_args: Dict):
+        """
+        Returns the prefetched result for a matching call, or None if the call has to run normally.
+        """
+        with self._lock:
+            future = self._futures.pop(normalize_args(function_name, function_args), None)
+        if future is None:
+            return None
+        try:
+            return future.result()
+        except Exception as e:
+            print(f'prefetched {function_name} failed, calling it again: {e}')
+            return None
+
+def start_prefetch(message: str, call_tool: Callable):
+    if not SPECULATIVE_PREFETCH or not message:
+        return None
+    try:
+        return Prefetch(message, call_tool)
+    except Exception as e:
+        print(f'Unable to start prefetch: {e}')
+        return None
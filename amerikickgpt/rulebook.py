@@ -0,0 +1,248 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import List, Dict
+from .endpoints import fetch_ruleset_pages
+
+RULEBOOK_PDF = 'output.pdf'
+RULEBOOK_CACHE = 'rulebook_cache.json.gz'
+RULEBOOK_CACHE_VERSION = 1
+RULES_INDEX_DIR = 'rules_indexdir'
+RULES_INDEX_HASH = 'rulebook.sha256'
+
+PAGE_LABEL_PATTERN = re.compile(r'Page \|\s+(\d+)')
+# a section heading is a roman numeral (optionally with a subsection number) followed by an upper case title,
+# ie "V.17.SPARRING PENALTIES" or "IX. MAXIMUM DEVIATION RULE". references like "Section V.17, Sparring" are skipped
+SECTION_HEADING_PATTERN = re.compile(r"(?<![A-Za-z])([IVXLCDM]+)\.(?:(\d{1,2})\.?)?\s?(?=[A-Z][A-Z\-/&,'’ ]{3})")
+TITLE_PATTERN = re.compile(r"[A-Z0-9][A-Z0-9\-–/&,'’()? ]*(?=\s+[A-Z]?[a-z]|\s*[a-z]\)|\s+[IVXLCDM]+\.|\s*$)")
+
+_rulebook = None
+_rulebook_stat = None
+_rulebook_lock = threading.Lock()
+rules_ix = None
+_rules_ix_lock = threading.Lock()
+
+def find_sections(text: str) -> List[str]:
+    # Define the regular expression pattern
+    pattern = r'[IVXLCDM]+\.\d{0,2}'
+
+    # Find all matches in the text
+    matches = re.findall(pattern, text)
+
+    return matches
+
+def hash_file(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+def _section_title(text: str, start: int) -> str:
+    title = TITLE_PATTERN.match(text, start)
+    if title is None:
+        return ''
+    # drop the first word of the body when it was swallowed by the title, ie "RANK RULE A competitor"
+    return re.sub(r'\s+[A-Z]$', '', title.group(0).strip())
+
+def build_rulebook(pdf_path: str = RULEBOOK_PDF) -> Dict:
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(pdf_path)
+    text = ''
+    pages = []
+    for index, page in enumerate(reader.pages):
+        page_text = page.extract_text()
+        label = PAGE_LABEL_PATTERN.search(page_text)
+        pages.append({
+            'index': index,
+            'page': int(label.group(1)) if label else index + 1,
+            'start': len(text),
+        })
+        text += PAGE_LABEL_PATTERN.sub('', page_text)
+
+    sections = []
+    for match in SECTION_HEADING_PATTERN.finditer(text):
+        page = next(p for p in reversed(pages) if p['start'] <= match.start())
+        if sections:
+            sections[-1]['end'] = match.start()
+        sections.append({
+            'section': match.group(1),
+            'subsection': match.group(2) or '',
+            'title': _section_title(text, match.end()),
+            'start': match.start(),
+            'end': len(text),
+            'page': page['page'],
+        })
+
+    return {
+        'version': RULEBOOK_CACHE_VERSION,
+        'pdf_sha256': hash_file(pdf_path),
+        'text': text,
+        'pages': pages,
+        'sections': sections,
+    }
+
+def _read_cache(cache_path: str):
+    try:
+        with gzip.open(cache_path, 'rt', encoding = 'utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_cache(cache_path: str, rulebook: Dict):
+    tmp_path = f'{cache_path}.tmp'
+    with gzip.open(tmp_path, 'wt', encoding = 'utf-8') as f:
+        json.dump(rulebook, f, separators = (',', ':'))
+    os.replace(tmp_path, cache_path)
+
+def load_rulebook(pdf_path: str = RULEBOOK_PDF, cache_path: str = RULEBOOK_CACHE) -> Dict:
+    """
+    Returns the parsed rulebook from the on disk cache, reparsing the pdf only when its hash no longer matches.
+    """
+    pdf_hash = hash_file(pdf_path)
+    rulebook = _read_cache(cache_path)
+    if rulebook and rulebook.get('version') == RULEBOOK_CACHE_VERSION and rulebook.get('pdf_sha256') == pdf_hash:
+        return rulebook
+
+    print(f'Rebuilding rulebook cache from {pdf_path}')
+    rulebook = build_rulebook(pdf_path)
+    try:
+        _write_cache(cache_path, rulebook)
+    except OSError as e:
+        print(f'Unable to write rulebook cache: {e}')
+    return rulebook
+
+def get_rulebook() -> Dict:
+    """
+    Process wide rulebook, shared by every streamlit session. The pdf is only stat'd on later calls
+    so a lookup does no parsing unless output.pdf is replaced.
+    """
+    global _rulebook, _rulebook_stat
+
+    stat = os.stat(RULEBOOK_PDF)
+    stat = (stat.st_mtime_ns, stat.st_size)
+    if _rulebook is not None and _rulebook_stat == stat:
+        return _rulebook
+
+    with _rulebook_lock:
+        if _rulebook is None or _rulebook_stat != stat:
+            _rulebook = load_rulebook()
+            _rulebook_stat = stat
+    return _rulebook
+
+def get_section(section: str, subsection: str = '') -> Dict:
+    rulebook = get_rulebook()
+    for entry in rulebook['sections']:
+        if entry['section'] == section and entry['subsection'] == str(subsection):
+            return {**entry, 'text': rulebook['text'][entry['start']:entry['end']]}
+    return None
+
+def get_page_map() -> str:
+    # section -> page json for the highlighted rulebook links, it only changes when the rulebook does
+    return fetch_ruleset_pages()
+
+def create_rules_index(index_dir: str, rulebook: Dict):
+    """
+    Indexes every section and subsection of the rulebook as its own document so a question
+    can be answered with the few relevant sections instead of the whole book.
+    """
+    from whoosh.index import create_in, open_dir, exists_in
+    from whoosh.fields import Schema, TEXT, ID, STORED
+    from whoosh.analysis import StemmingAnalyzer
+    from whoosh import writing
+
+    if not os.path.exists(index_dir):
+        os.mkdir(index_dir)
+
+    if exists_in(index_dir):
+        ix = open_dir(index_dir)
+    else:
+        schema = Schema(
+            section=ID(stored=True, unique=True),
+            title=TEXT(stored=True, analyzer=StemmingAnalyzer(), field_boost=2.0),
+            content=TEXT(analyzer=StemmingAnalyzer()),
+            page=STORED(),
+            start=STORED(),
+            end=STORED(),
+        )
+        ix = create_in(index_dir, schema)
+
+    writer = ix.writer()
+    text = rulebook['text']
+    for entry in rulebook['sections']:
+        writer.add_document(
+            section=f"{entry['section']}.{entry['subsection']}".rstrip('.'),
+            title=entry['title'].lower(),
+            content=text[entry['start']:entry['end']].lower(),
+            page=entry['page'],
+            start=entry['start'],
+            end=entry['end'],
+        )
+    writer.commit(mergetype=writing.CLEAR)
+
+    with open(os.path.join(index_dir, RULES_INDEX_HASH), 'w') as f:
+        f.write(rulebook['pdf_sha256'])
+
+    return ix
+
+def get_rules_index():
+    global rules_ix
+    from whoosh.index import open_dir, exists_in
+
+    rulebook = get_rulebook()
+    if rules_ix is not None and rules_ix.rulebook_sha256 == rulebook['pdf_sha256']:
+        return rules_ix
+
+    with _rules_ix_lock:
+        if rules_ix is None or rules_ix.rulebook_sha256 != rulebook['pdf_sha256']:
+            try:
+                with open(os.path.join(RULES_INDEX_DIR, RULES_INDEX_HASH)) as f:
+                    indexed_hash = f.read().strip()
+            except OSError:
+                indexed_hash = None
+
+            if indexed_hash == rulebook['pdf_sha256'] and exists_in(RULES_INDEX_DIR):
+                ix = open_dir(RULES_INDEX_DIR)
+            else:
+                print(f'Rebuilding rules index in {RULES_INDEX_DIR}')
+                ix = create_rules_index(RULES_INDEX_DIR, rulebook)
+            ix.rulebook_sha256 = rulebook['pdf_sha256']
+            rules_ix = ix
+    return rules_ix
+
+def search_rules(question: str, limit: int = 4) -> List[Dict]:
+    """
+    Returns the top sections of the rulebook for a question, ranked by BM25 over section titles and text.
+    """
+    from whoosh.qparser import MultifieldParser, OrGroup
+
+    rulebook = get_rulebook()
+    ix = get_rules_index()
+
+    # free text questions are reduced to plain terms so whoosh query syntax (quotes, colons, wildcards) can't break the parse
+    terms = ' '.join(re.findall(r"[a-z0-9]+", question.lower()))
+    if not terms:
+        return []
+
+    sections = []
+    with ix.searcher() as searcher:
+        query = MultifieldParser(['title', 'content'], ix.schema, group=OrGroup.factory(0.9)).parse(terms)
+        for result in searcher.search(query, limit=limit):
+            sections.append({
+                'section': result['section'],
+                'title': result['title'],
+                'page': result['page'],
+                'score': round(result.score, 2),
+                'text': rulebook['text'][result['start']:result['end']].strip(),
+            })
+    return sections
+
+if __name__ == '__main__':
+    rulebook = load_rulebook()
+    print(f"{len(rulebook['pages'])} pages, {len(rulebook['sections'])} sections cached to {RULEBOOK_CACHE}")
+    create_rules_index(RULES_INDEX_DIR, rulebook)
+    print(f'Rules index written to {RULES_INDEX_DIR}')
@@ -0,0 +1,151 @@
+"""
+HTTP/JSON front end for the chat engine, so chat workers can be run and scaled separately from the streamlit ui.
+
+    python -m amerikickgpt.server --port 8080
+
+POST /chat with {"messages": [{"role": "user", "content": "..."}], "email": "..."} streams the answer as
+newline delimited json: {"delta": "..."} per chunk, then {"done": true} or {"error": "..."}.
+The system prompt is added when the messages don't start with one. GET /health returns the cache stats.
+POST /warmup loads every verified official's judging assignment and keeps them refreshed, see assignments.py.
+
+The email must be on the verified users worksheet, the same allowlist the ui checks. Set CHAT_SERVER_TOKEN
+to require an "Authorization: Bearer <token>" header, it is required unless the server only listens on loopback.
+"""
+import argparse
+import ipaddress
+import json
+import os
+import traceback
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from . import preload
+from .allowlist import is_allowed
+from .assignments import warm_assignments
+from .cache import cache_stats
+from .engine import system_message, respond
+from .sheet import get_sheet
+
+CHAT_SERVER_TOKEN = os.environ.get('CHAT_SERVER_TOKEN')
+# requests larger than this are rejected before they are read
+MAX_REQUEST_BYTES = 256 * 1024
+
+def is_loopback(host: str) -> bool:
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+class ChatHandler(BaseHTTPRequestHandler):
+    # chunked responses need http/1.1
+    protocol_version = 'HTTP/1.1'
+
+    def send_json(self, status: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        if status >= 400:
+            # errors can be sent before the body is read, so the rest of it must not be taken for the next request
+            self.send_header('Connection', 'close')
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(data)
+
+    def write_chunk(self, body: dict):
+        data = (json.dumps(body) + '\n').encode()
+        self.wfile.write(f'{len(data):X}\r\n'.encode() + data + b'\r\n')
+        self.wfile.flush()
+
+    def authorized(self) -> bool:
+        if not CHAT_SERVER_TOKEN:
+            # without a token only clients on the same host can reach the server
+            return is_loopback(self.server.server_address[0])
+        return self.headers.get('Authorization') == f'Bearer {CHAT_SERVER_TOKEN}'
+
+    def do_GET(self):
+        if self.path != '/health':
+            return self.send_json(404, {'error': 'not found'})
+        self.send_json(200, {'status': 'ok', 'caches': cache_stats()})
+
+    def do_POST(self):
+        if self.path not in ('/chat', '/warmup'):
+            return self.send_json(404, {'error': 'not found'})
+        if not self.authorized():
+            return self.send_json(401, {'error': 'unauthorized'})
+        if self.path == '/warmup':
+            try:
+                return self.send_json(200, warm_assignments())
+            except Exception as e:
+                print(traceback.format_exc())
+                return self.send_json(502, {'error': f'unable to load assignments: {e}'})
+
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_REQUEST_BYTES:
+            return self.send_json(413, {'error': 'request too large'})
+        try:
+            request = json.loads(self.rfile.read(length) or b'{}')
+            messages = list(request['messages'])
+            if not all(isinstance(message, dict) for message in messages):
+                raise ValueError('every message must be an object')
+            if not messages or messages[-1].get('role') != 'user' or not isinstance(messages[-1].get('content'), str):
+                raise ValueError('the last message must be a user message')
+        except (KeyError, TypeError, ValueError) as e:
+            return self.send_json(400, {'error': f'invalid request: {e}'})
+
+        # the email decides whose judging assignment the tools read, so it has to be a verified one
+        email = request.get('email')
+        try:
+            verified = isinstance(email, str) and is_allowed(get_sheet(), email)
+        except Exception:
+            print(traceback.format_exc())
+            return self.send_json(503, {'error': 'unable to verify the email right now'})
+        if not verified:
+            return self.send_json(403, {'error': 'email is not verified'})
+
+        if messages[0].get('role') != 'system':
+            messages.insert(0, system_message(datetime.now().strftime("%I:%M%p %A, %B %d")))
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+
+        response = respond(messages, email)
+        try:
+            for chunk in response:
+                self.write_chunk({'delta': chunk})
+            self.write_chunk({'done': True})
+        except (BrokenPipeError, ConnectionResetError):
+            # the client went away, closing the generator cancels the conversation
+            response.close()
+            return
+        except Exception:
+            print(traceback.format_exc())
+            self.write_chunk({'error': 'internal error'})
+        self.wfile.write(b'0\r\n\r\n')
+
+def main():
+    parser = argparse.ArgumentParser(description = 'AmerikickGPT chat server')
+    parser.add_argument('--host', default = os.environ.get('CHAT_SERVER_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type = int, default = int(os.environ.get('CHAT_SERVER_PORT', 8080)))
+    args = parser.parse_args()
+    if not CHAT_SERVER_TOKEN and not is_loopback(args.host):
+        parser.error(f'set CHAT_SERVER_TOKEN to listen on {args.host}, without it the server only listens on loopback')
+
+    # workers create their clients before taking traffic
+    preload(background = False)
+    server = ThreadingHTTPServer((args.host, args.port), ChatHandler)
+    server.daemon_threads = True
+    print(f'chat server listening on {args.host}:{args.port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+import os
+import sqlite3
+import threading
+import time
+
+SESSION_DB = os.environ.get('SESSION_DB', 'sessions.sqlite3')
+# rows a new activity worksheet is created with
+ACTIVITY_WORKSHEET_ROWS = 100
+
+# email -> (session_date, session_count), served from memory and written through to sqlite
+_sessions = {}
+_connection = None
+_lock = threading.Lock()
+
+def _get_connection() -> sqlite3.Connection:
+    global _connection
+
+    if _connection is None:
+        _connection = sqlite3.connect(SESSION_DB, check_same_thread = False)
+        _connection.execute('''
+            CREATE TABLE IF NOT EXISTS sessions (
+                email TEXT PRIMARY KEY,
+                session_date TEXT NOT NULL,
+                session_count INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        ''')
+        _connection.commit()
+    return _connection
+
+def record_session(email: str, session_date: str, session_count: int):
+    with _lock:
+        _sessions[email] = (session_date, int(session_count))
+        try:
+            connection = _get_connection()
+            connection.execute(
+                'INSERT OR REPLACE INTO sessions (email, session_date, session_count, updated_at) VALUES (?, ?, ?, ?)',
+                (email, session_date, int(session_count), time.time())
+            )
+            connection.commit()
+        except sqlite3.Error as e:
+            print(f'Unable to record session for {email}: {e}')
+
+def get_latest_session(email: str):
+    """
+    Returns the (session_date, session_count) last logged for the email, or None if this host has not seen it.
+    """
+    with _lock:
+        if email in _sessions:
+            return _sessions[email]
+        try:
+            row = _get_connection().execute(
+                'SELECT session_date, session_count FROM sessions WHERE email = ?', (email,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f'Unable to read session for {email}: {e}')
+            return None
+        if row is not None:
+            _sessions[email] = (row[0], int(row[1]))
+        return _sessions.get(email)
+
+def read_latest_session_from_worksheet(worksheet):
+    """
+    Fallback for emails missing from the store, reads the session columns of the last rows of the worksheet only.
+    Activity worksheets start with ACTIVITY_WORKSHEET_ROWS rows and appends only add rows once those are full,
+    so the last logged session is always within that many rows of the end of the grid.
+    """
+    last_row = worksheet.row_count
+    rows = worksheet.get_values(f'A{max(1, last_row - ACTIVITY_WORKSHEET_ROWS + 1)}:B{last_row}')
+    rows = [row for row in rows if len(row) >= 2 and row[1] != '']
+    # a worksheet with only its header row has no session yet
+    if not rows or not str(rows[-1][1]).isdigit():
+        return None
+    return rows[-1][0], int(rows[-1][1])
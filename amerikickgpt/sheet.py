@@ -0,0 +1,31 @@
+import json
+import os
+import threading
+
+_sheet = None
+_sheet_lock = threading.Lock()
+
+def get_secret(name: str) -> str:
+    # environment variables first so the engine can run without streamlit, then streamlit's secrets
+    if name in os.environ:
+        return os.environ[name]
+    import streamlit as st
+    return st.secrets[name]
+
+def get_sheet():
+    """
+    Opens the tournament spreadsheet on first use and reuses it for the rest of the process.
+    """
+    global _sheet
+    with _sheet_lock:
+        if _sheet is None:
+            # gspread and google auth are only imported once the sheet is needed
+            from google.oauth2 import service_account
+            import gspread
+
+            service_account_info = json.loads(get_secret("GOOGLE_SHEET_CREDENTIALS"))
+
+            credentials = service_account.Credentials.from_service_account_info(service_account_info, scopes=['https://www.googleapis.com/auth/spreadsheets'])
+            client = gspread.authorize(credentials)
+            _sheet = client.open_by_key(get_secret('GOOGLE_SHEET_ID'))
+    return _sheet
@@ -0,0 +1,109 @@
+import atexit
+import queue
+import threading
+import time
+
+class SheetLogger:
+    """
+    Writes conversation rows to google sheets from a background thread so users never wait on the
+    sheets api. Rows queued within flush_interval are grouped per worksheet into one append_rows call.
+    """
+    def __init__(self, sheet, flush_interval: float = 2.0, max_batch: int = 500, max_attempts: int = 5):
+        self.sheet = sheet
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_attempts = max_attempts
+        self._queue = queue.Queue()
+        self._worksheets = {}
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target = self._run, name = 'sheet-logger', daemon = True)
+        self._thread.start()
+
+    def log(self, worksheet_name: str, row: list):
+        self._queue.put((worksheet_name, row))
+
+    def cache_worksheet(self, worksheet):
+        self._worksheets[worksheet.title] = worksheet
+
+    def flush(self, timeout: float = None):
+        """
+        Blocks until every row queued so far has been written.
+        """
+        done = threading.Event()
+        self._queue.put((None, done))
+        return done.wait(timeout)
+
+    def stop(self, timeout: float = 10):
+        self._stopped.set()
+        self._queue.put((None, None))
+        self._thread.join(timeout)
+
+    def _get_worksheet(self, worksheet_name: str):
+        if worksheet_name not in self._worksheets:
+            self._worksheets[worksheet_name] = self.sheet.worksheet(worksheet_name)
+        return self._worksheets[worksheet_name]
+
+    def _append_rows(self, worksheet_name: str, rows: list):
+        import gspread
+
+        for attempt in range(self.max_attempts):
+            try:
+                self._get_worksheet(worksheet_name).append_rows(rows)
+                return
+            except gspread.exceptions.APIError as e:
+                status = e.response.status_code
+                if (status != 429 and status < 500) or attempt == self.max_attempts - 1:
+                    raise
+                time.sleep(min(2 ** attempt, 30))
+
+    def _write(self, batch: list):
+        rows_by_worksheet = {}
+        for worksheet_name, row in batch:
+            rows_by_worksheet.setdefault(worksheet_name, []).append(row)
+
+        for worksheet_name, rows in rows_by_worksheet.items():
+            try:
+                self._append_rows(worksheet_name, rows)
+            except Exception as e:
+                self._worksheets.pop(worksheet_name, None)
+                print(f'Unable to log {len(rows)} rows to {worksheet_name}: {e}')
+
+    def _run(self):
+        while True:
+            batch, waiters = [], []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                worksheet_name, row = item
+                if worksheet_name is None:
+                    # flush or stop marker, write what has been collected right away
+                    if row is not None:
+                        waiters.append(row)
+                    break
+                batch.append(item)
+                if len(batch) >= self.max_batch:
+                    break
+                try:
+                    item = self._queue.get(timeout = max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._write(batch)
+            for waiter in waiters:
+                waiter.set()
+            if self._stopped.is_set() and self._queue.empty():
+                return
+
+_logger = None
+_logger_lock = threading.Lock()
+
+def get_sheet_logger(sheet) -> SheetLogger:
+    global _logger
+
+    if _logger is None:
+        with _logger_lock:
+            if _logger is None:
+                _logger = SheetLogger(sheet)
+                atexit.register(_logger.stop)
+    return _logger
@@ -0,0 +1,793 @@
+import asyncio
+import json
+import re
+import traceback
+from datetime import datetime
+from typing import List, Dict
+from . import tournament_info as info
+from .answer_cache import STATIC_TOOLS
+from .assignments import assignment_email
+from .rulebook import get_rulebook, get_page_map, search_rules
+from .divisions import get_divisions_by_code, search_divisions, get_ring_schedule, division_start
+from .endpoints import fetch_judging_assignment, fetch_highlighted_ruleset_url, fetch_ring_start_time, fetch_places, fetch_weekend_schedule
+from .endpoints import afetch_ruleset_pages, afetch_judging_assignment, afetch_ring_start_time, afetch_places
+
+def get_referee_dress_code():
+    quoted, quote = info.DRESS_CODE_QUOTE
+    return f'''
+    {info.DRESS_CODE}
+
+    Please also provide the following quote from {quoted}: "{quote}"
+    '''
+
+def get_event_map():
+    return f'''
+    provide the user with the following clickable link {info.EVENT_MAP_URL}
+    '''
+
+def rules_prompt(text: str, pages: str) -> str:
+    return f'''
+        After your rule interpretation, provide a link like "https://storage.googleapis.com/naska_rules/rule_book_<section>.pdf#page=<page>" to the highlighted rulebook so the user can click on it if they choose.
+
+        rule book:
+
+        {text}
+
+        Use your interpreation of the rules to select the seciton. which should not include periods, spaces, it should be formatted like VIII2, or IX etc. If applicable, provide the subsection of the rules to and in the link you provide the user. 
+        ONLY SECITON IX HAS NOT SUBSECTIONS, ALL OTHER SECTIONS REQUIRE A SUBSECTION NUMBER IN URL (LIKE V2). DO NOT INCLUDE A PERIOD OR SPACE BETWEEN THE SECTION LETTER AND SUBSECTION NUMBER
+        USE THE JSON BELOW TO SELECT THE PAGE NUMBER. ALL URLS REQUIRE A PAGE NUMBER
+        {pages}
+        '''
+
+def relevant_rules_prompt(sections: List[Dict], pages: str) -> str:
+    return f'''
+        After your rule interpretation, provide a link like "https://storage.googleapis.com/naska_rules/rule_book_<section>.pdf#page=<page>" to the highlighted rulebook so the user can click on it if they choose.
+
+        the following sections of the rule book were found to be most relevant to the question, most relevant first:
+
+        {json.dumps(sections)}
+
+        If none of these sections answer the question, call get_rules to read the entire rule book.
+        Use your interpreation of the rules to select the seciton. which should not include periods, spaces, it should be formatted like VIII2, or IX etc. If applicable, provide the subsection of the rules to and in the link you provide the user. 
+        ONLY SECITON IX HAS NOT SUBSECTIONS, ALL OTHER SECTIONS REQUIRE A SUBSECTION NUMBER IN URL (LIKE V2). DO NOT INCLUDE A PERIOD OR SPACE BETWEEN THE SECTION LETTER AND SUBSECTION NUMBER
+        USE THE JSON BELOW TO SELECT THE PAGE NUMBER. ALL URLS REQUIRE A PAGE NUMBER
+        {pages}
+        '''
+
+def get_rules():
+    try:
+        return rules_prompt(get_rulebook()['text'], get_page_map())
+    except Exception as e:
+        print(f'Ruleset broke: {e}')
+        raise
+
+async def get_rules_async():
+    try:
+        rulebook = await asyncio.to_thread(get_rulebook)
+        return rules_prompt(rulebook['text'], await afetch_ruleset_pages())
+    except Exception as e:
+        print(f'Ruleset broke: {e}')
+        raise
+
+def get_relevant_rules(rules_question: str):
+    try:
+        sections = search_rules(rules_question)
+        if not sections:
+            return get_rules()
+        return relevant_rules_prompt(sections, get_page_map())
+    except Exception as e:
+        print(f'Rules search broke: {e}')
+        raise
+
+async def get_relevant_rules_async(rules_question: str):
+    try:
+        sections = await asyncio.to_thread(search_rules, rules_question)
+        if not sections:
+            return await get_rules_async()
+        return relevant_rules_prompt(sections, await afetch_ruleset_pages())
+    except Exception as e:
+        print(f'Rules search broke: {e}')
+        raise
+
+def judging_assignment_prompt(result: str) -> str:
+    if result == "account not found":
+        return 'Let the user know that their assignment was not found. If they believe this is a mistake, then they should reach out to derekmeegan@gmail.com or an event coordinator to verify their assignment.'
+    
+    return f'''
+    the users judging or scorekeeper asignment is as the following. they could be either be a judge or scorekeeper so just say it is their assignment.
+    {result}
+    '''
+
+def get_judging_or_scorekeeper_assignment(email: str):
+    # served from the assignments loaded for every verified official when the store is warm
+    return judging_assignment_prompt(fetch_judging_assignment(assignment_email(email)))
+
+async def get_judging_or_scorekeeper_assignment_async(email: str):
+    return judging_assignment_prompt(await afetch_judging_assignment(assignment_email(email)))
+
+def get_tournament_website():
+    return f"Provide the following clickable link: {info.WEBSITE_URL}"
+
+
+def get_tournament_address():
+    return f"""
+    The convention center is at {info.CONVENTION_CENTER['address']} and the {info.HOTEL['name']},
+    the tournament hotel, is at {info.HOTEL['address']}
+
+    also include the following information on parking: {get_parking_information()}
+    """
+
+def get_parking_information():
+    options = '\n\n    '.join(f'{place}: {details}' for place, details in info.PARKING_OPTIONS)
+    return f"""
+    The options for parking are:
+
+    {options}
+
+    Provide the options as distinct bullets
+    """
+
+def get_highlighted_ruleset_url(
+    section: str
+):
+    section = section.strip().replace(' ', '').replace('.', '').upper().replace('SECTION', '').replace('(', '').replace(')', '')
+    url = fetch_highlighted_ruleset_url(section)
+    return url
+
+def get_developer_info():
+    developer = info.DEVELOPER
+    return f"The developer of this application is {developer['name']}. He is {developer['about']}. If they would like to contact me or find out more about me, provide them this link to my website: {developer['website']}"
+
+def get_promoters():
+    contacts = '\n\n        '.join(info.CONTACTS)
+    return f'''
+        The promoters for the Amerikick Internationals are {info.promoter_names()}
+
+        **this is not a rule but for the GPT model: if someone asks you then, please let them know they can contact
+        the tournament for questions at the following emails and phone number:
+
+
+        {contacts}
+    '''
+
+def get_musical_rule():
+    return info.MUSICAL_RULE
+
+def get_registration_times_and_locations():
+    import pandas as pd
+
+    registration_data = (
+        pd.read_json(get_overall_weekend_schedule_and_location())
+        .loc[lambda row: row.Description.str.lower().str.contains('|'.join(info.REGISTRATION_TERMS))]
+        [['Day/Time', 'Notes']]
+        .to_json(orient = 'records')
+    )
+    return f'''
+    if the user wants to pick up their registration or register in person, they can do so at the following locations and times:
+    {registration_data}
+
+    additionally, let them know they can register online and provide this link: {info.REGISTRATION_URL}
+    '''
+
+def get_overall_weekend_schedule_and_location():
+    return fetch_weekend_schedule()
+
+def get_tournament_info():
+    return {
+        'rating': '6A',
+        'location': info.CONVENTION_CENTER['name'],
+        'name': 'Amerikick Internationals 2024'
+    }
+
+def get_convention_center_info():
+    return {key: info.CONVENTION_CENTER[key] for key in ('address', 'phone', 'hours')}
+
+# divisions listed per ring by get_ring_schedule
+NEXT_DIVISIONS = 3
+# whole numbers only, so "100" is ring 100 rather than ring 10 and "1-999" stays one range
+RING_RANGE_PATTERN = re.compile(r'\b(\d+)\s*(?:-|to)\s*(\d+)\b|\b(\d+)(?:st|nd|rd|th)?\b|\bstage\b')
+
+def tournament_day(day: str = "friday") -> str:
+    day = str(day).lower()
+
+    # Get the current day of the week if 'day' is not provided
+    current_day = datetime.now().strftime('%A')
+
+    # Check if the day is Saturday
+    if current_day.lower() == "saturday":
+        day = "saturday"
+    return day
+
+def ring_params(ring: str, day: str = "friday"):
+    """
+    Returns the (day, ring) to look up, raises ValueError for a ring that is not a number or stage.
+    """
+    if ring != 'stage':
+        ring = int(ring)
+    return tournament_day(day), ring
+
+def scheduled_ring_start(day: str, ring) -> str:
+    """
+    The ring's start time from the division schedule, or None when the schedule doesn't have the ring.
+    """
+    divisions = get_ring_schedule(day).get(str(ring))
+    if not divisions:
+        return None
+    first = divisions[0]
+    return f"Ring {ring} starts at {first['time']} on {day.capitalize()} with {first['name']} ({first['division_code']})"
+
+def ring_start_time_prompt(start_time: str) -> str:
+    return f"""
+        The following start time was identified. if the start time was not found, let the user know. make sure to include in at the end of your response on its own line that this feature is powered by Uventex
+        Please reiterate the day and time in your response. Use the words Friday or Saturday explicitly and make sure to include am or pm
+        {start_time}
+        """
+
+def get_ring_start_time(ring: str, day: str = "friday") -> str:
+    try:
+        day, ring = ring_params(ring, day)
+    except ValueError:
+        return "I'm sorry, I could not find the ring number you specified."
+    # the schedule is kept in memory from the divisions feed, the ring endpoint is only asked about rings it doesn't have
+    start_time = scheduled_ring_start(day, ring) or fetch_ring_start_time(day, ring)
+    return ring_start_time_prompt(start_time)
+
+async def get_ring_start_time_async(ring: str, day: str = "friday") -> str:
+    try:
+        day, ring = ring_params(ring, day)
+    except ValueError:
+        return "I'm sorry, I could not find the ring number you specified."
+    start_time = await asyncio.to_thread(scheduled_ring_start, day, ring) or await afetch_ring_start_time(day, ring)
+    return ring_start_time_prompt(start_time)
+
+def ring_numbers(rings: str, scheduled: dict) -> tuple:
+    """
+    The rings asked for, ie "5", "1, 4, 7", "1-20", "stage" or "all", as (the ones on the schedule, the ones named
+    that aren't). A range only counts as missing by its ends past the last ring.
+    """
+    rings = str(rings).lower()
+    if not rings.strip() or 'all' in rings:
+        wanted, missing = list(scheduled), []
+    else:
+        numbered = [int(ring) for ring in scheduled if ring.isdigit()]
+        last_ring = max(numbered, default = 0)
+        wanted, missing = [], []
+        for match in RING_RANGE_PATTERN.finditer(rings):
+            if match.group(1):
+                low, high = sorted((int(match.group(1)), int(match.group(2))))
+                wanted.extend(str(ring) for ring in numbered if low <= ring <= high)
+                missing.extend(str(ring) for ring in (low, high) if ring > last_ring)
+            else:
+                ring = str(int(match.group(3))) if match.group(3) else match.group(0)
+                (wanted if ring in scheduled else missing).append(ring)
+    order = lambda ring: (not ring.isdigit(), int(ring) if ring.isdigit() else 0)
+    return sorted(set(wanted), key = order), sorted(set(missing), key = order)
+
+def ring_summary(ring: str, divisions: list, now = None) -> dict:
+    """
+    When the ring starts and ends, the division it is running at `now` and the next ones after it.
+    """
+    summary = {
+        'ring': ring,
+        'start_time': divisions[0]['time'],
+        'last_division_time': divisions[-1]['time'],
+        'divisions': len(divisions),
+    }
+    if now is not None:
+        started = [division for division in divisions if division_start(division) <= now]
+        if started:
+            summary['current'] = {key: started[-1][key] for key in ('division_code', 'name', 'time')}
+        divisions = divisions[len(started):]
+    summary['next'] = [{key: division[key] for key in ('division_code', 'name', 'time')} for division in divisions[:NEXT_DIVISIONS]]
+    return summary
+
+def get_ring_schedule_for_rings(rings: str = 'all', day: str = "friday") -> str:
+    day = tournament_day(day)
+    scheduled = get_ring_schedule(day)
+    # on the day itself the schedule is read from the current time, so "next" means not started yet
+    now = datetime.now()
+    now = now.time() if now.strftime('%A').lower() == day else None
+    found, missing = ring_numbers(rings, scheduled)
+    summaries = [ring_summary(ring, scheduled[ring], now) for ring in found]
+    no_such_ring = f"there is no ring {', '.join(missing)} on the {day.capitalize()} schedule." if missing else ''
+    if not summaries:
+        return f"I'm sorry, {no_such_ring or f'I could not find ring {rings} on the {day.capitalize()} schedule.'}"
+
+    return f'''
+    The following is the {day.capitalize()} schedule for the rings the user asked about. start_time is when the first division in the ring starts,
+    current is the division running now and next lists the divisions coming up, if current is missing the ring has not started yet or it is not {day.capitalize()} yet.
+    Answer only what the user asked, ie just the start time or just what is next. Remind them the times are estimated and may change based on completion of prior divisions.
+    make sure to include in at the end of your response on its own line that this feature is powered by Uventex
+    {f'Tell the user {no_such_ring}' if missing else ''}
+    {json.dumps(summaries)}
+    '''
+
+
+def get_division_info_and_time_by_keywords(division_query_phrase: str):
+    import pandas as pd
+    from .division_query import ambiguous_query
+
+    ambiguous = ambiguous_query(division_query_phrase)
+    if ambiguous:
+        return ambiguous
+
+    print('query phrase below')
+    print(division_query_phrase)
+    relevant_divisions = [
+        {
+            "division_code": division["division_code"],
+            "name": division["name"],
+            "time" : division['time'],
+            "day": division['day'],
+            "ring": division['ring'],
+            "score": division['score'],
+            "match": division['match'],
+        }
+        # filtered by the ages, rank, gender and events in the phrase, strict matches first,
+        # falling back to typo tolerant and closest name matches, ranked by its words when it names only facets
+        for division in search_divisions(division_query_phrase)
+    ]
+
+    if not relevant_divisions:
+        return "No divisions found matching the provided query."
+
+    # Convert the relevant divisions to JSON
+    relevant_divisions_json = pd.DataFrame(relevant_divisions).to_json(orient='records')
+    print(relevant_divisions_json)
+
+    return f'''
+    The following divisions were found to be closest to what the user requested: 
+    {relevant_divisions_json}.
+    Please provide them with the day, time, and ring number associated with the division closest to what they originally requested.
+    If there are several divisions that are very, very similar, then provide information for all of those divisions.
+    score is how closely the division name matches the request out of 100. If match is not "strict" the names may be spelled
+    differently from what the user wrote, so only give the divisions that plausibly fit their request. "facets" means the division
+    has every age, rank, gender and event the request names, ie women means the 18 & over divisions.
+    Remind them the times are estimated and may change based on completion of prior divisions. If they did not provide all fields,
+    let them know you can provide better results if they provide further detail. make sure to include in at the end of your response on its own line that this feature is powered by Uventex
+    '''
+
+def get_division_info_and_time_by_code(
+    division_code: str
+):
+    division = json.dumps(get_divisions_by_code(division_code))
+    
+    return f'''
+    YOU MUST provide them with the FULL DIVISION NAME, DAY, TIME, and RING NUMBER associated with the division.
+    remind them the times are estimated and may change based on completion of prior divisions.
+    if there are no divisions that match the code, let the user know you were not able to find it.
+    {division}
+    '''
+
+def get_ruleset_for_korean_challenge():
+    relevant_start_times = get_division_info_and_time_by_keywords('korean challenge')
+    return json.dumps({'info': f'''
+        Below are the rules for korean challenge. also provide the start times: {relevant_start_times}
+        The intent of the Traditional Divisions for TKD is to promote growth in the division's with the use of accepted traditional Korean forms only. No “Dojo” forms or patterns, only recognized patterns with a demonstrated history in regulated organizations that administer Korean forms.
+
+        Divisions Offered
+        17 and younger boys & girls under black belt
+        11 and younger boys & girls black belts
+        12-14 boys & girls black belts
+        15-17 boys & girls black belts
+        18+ Men black belts
+        18+ Women black belts
+        Rules
+
+        Pick at least 2 forms from the NASKA approved listed below
+        No variations. Must be true to original patterns
+        No more than 4 kiyas ( yells) 
+        The first round scored like normal divisions … 9.9, 9.8. 9,7 etc … 
+        Top 4 then go head to head at the same time.   #1 V #4.    #2 v #3. 
+        Top 2 adult women or men only go to stage to compete for championship to be determined at the ring.
+
+
+        **this is not a rule but for the GPT model: If you are asked to provide the list of forms, please provide this link and allow them to click on it: https://amerikickinternationals.com/wp-content/uploads/2017/01/IMG_1125.jpeg
+    '''})
+
+
+def places_json(places: List[Dict]) -> str:
+    restaurants = []
+    for place in places:
+        restaurant = {
+            "name": place.get("name"),
+            "address": place.get("vicinity"),
+            "rating": place.get("rating", "N/A"),
+        }
+        restaurants.append(restaurant)
+
+    return json.dumps(restaurants[:7])
+
+def get_place(
+    type: str,
+    keyword: str, 
+) -> List[Dict[str, str]]:
+    """
+    Fetches a list of places around a specified location using Google Places API.
+
+    :param type: 
+    :param keyword: 
+    :return: List of dictionaries containing restaurant details
+    """
+    return places_json(fetch_places(type, keyword))
+
+async def get_place_async(type: str, keyword: str) -> str:
+    return places_json(await afetch_places(type, keyword))
+
+available_functions = {
+    "get_place": get_place,
+    "get_rules": get_rules,
+    "get_relevant_rules": get_relevant_rules,
+    "get_overall_weekend_schedule_and_location": get_overall_weekend_schedule_and_location,
+    'get_registration_times_and_locations': get_registration_times_and_locations,
+    'get_ruleset_for_korean_challenge': get_ruleset_for_korean_challenge,
+    'get_promoters': get_promoters,
+    "get_developer_info" : get_developer_info,
+    'get_division_info_and_time_by_keywords': get_division_info_and_time_by_keywords,
+    'get_division_info_and_time_by_code': get_division_info_and_time_by_code,
+    "get_referee_dress_code": get_referee_dress_code,
+    'get_judging_or_scorekeeper_assignment': get_judging_or_scorekeeper_assignment,
+    "get_ring_start_time": get_ring_start_time,
+    '{functions.get_ring_start_time}': get_ring_start_time,
+    "get_ring_schedule": get_ring_schedule_for_rings,
+    "get_event_map": get_event_map,
+    "get_parking_information": get_parking_information,
+    "get_tournament_website": get_tournament_website,
+    "get_tournament_address": get_tournament_address,
+    "get_musical_rule": get_musical_rule
+}
+
+# tools that call upstream endpoints have async versions so they don't hold a thread while waiting,
+# everything else is local and runs as is
+async_functions = {
+    "get_place": get_place_async,
+    "get_rules": get_rules_async,
+    "get_relevant_rules": get_relevant_rules_async,
+    'get_judging_or_scorekeeper_assignment': get_judging_or_scorekeeper_assignment_async,
+    "get_ring_start_time": get_ring_start_time_async,
+    '{functions.get_ring_start_time}': get_ring_start_time_async,
+}
+
+# upper bound on tool calls run at the same time for a single answer
+MAX_TOOL_WORKERS = 4
+
+def tool_kwargs(function_name: str, function_args: dict, email: str = None) -> dict:
+    if function_name == 'get_place':
+        return {
+            'type': function_args.get("type"),
+            'keyword': function_args.get("keyword"),
+        }
+    elif function_name == 'get_division_info_and_time_by_keywords':
+        return {'division_query_phrase': function_args.get("division_query_phrase")}
+    elif function_name == 'get_relevant_rules':
+        return {'rules_question': function_args.get("rules_question")}
+    elif function_name == 'get_division_info_and_time_by_code':
+        return {'division_code': function_args.get("division_code")}
+    elif function_name == 'get_ring_start_time' or function_name == '{functions.get_ring_start_time}':
+        if 'day' in function_args:
+            return {'ring': function_args.get("ring"), 'day': function_args.get("day")}
+        return {'ring': function_args.get("ring")}
+    elif function_name == 'get_ring_schedule':
+        if 'day' in function_args:
+            return {'rings': function_args.get("rings", 'all'), 'day': function_args.get("day")}
+        return {'rings': function_args.get("rings", 'all')}
+    elif function_name == 'get_judging_or_scorekeeper_assignment':
+        # the assignment is always the current user's, never one the model asked for
+        return {'email': email}
+    return {}
+
+def call_tool(function_name: str, function_args: dict, email: str = None):
+    function_to_call = available_functions[function_name]
+    function_response = function_to_call(**tool_kwargs(function_name, function_args, email))
+
+    print(f'calling {function_to_call} with {function_args}')
+    return function_response
+
+async def call_tool_async(function_name: str, function_args: dict, email: str = None):
+    if function_name in async_functions:
+        function_to_call = async_functions[function_name]
+        function_response = await function_to_call(**tool_kwargs(function_name, function_args, email))
+        print(f'calling {function_to_call} with {function_args}')
+        return function_response
+
+    if function_name in STATIC_TOOLS:
+        return call_tool(function_name, function_args)
+    # index lookups and the pandas schedule tools run on the loop's thread pool
+    return await asyncio.to_thread(call_tool, function_name, function_args)
+
+async def run_tools_async(tool_calls: List[Dict], prefetch = None, email: str = None) -> List[str]:
+    """
+    Runs every tool call from one completion at the same time, so the answer waits on the slowest tool
+    rather than the sum of them. Results are returned in the order of the calls.
+    """
+    semaphore = asyncio.Semaphore(MAX_TOOL_WORKERS)
+
+    async def run(call):
+        async with semaphore:
+            try:
+                function_args = json.loads(call['arguments'] or '{}')
+                if prefetch is not None:
+                    function_response = await asyncio.to_thread(prefetch.take, call['name'], function_args)
+                    if function_response is not None:
+                        print(f"using prefetched {call['name']} with {function_args}")
+                        return function_response
+                return await call_tool_async(call['name'], function_args, email)
+            except Exception:
+                print(traceback.format_exc())
+                return f"The {call['name']} tool failed, let the user know you were not able to retrieve that information right now."
+
+    return await asyncio.gather(*(run(call) for call in tool_calls))
+
+# function schemas sent to the model, one per entry in available_functions
+TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "get_judging_or_scorekeeper_assignment",
+            "description": "Provides the judging or scorekeeper assignment for the current user. User could be either a judge or scorekeeper.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                },
+            },
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_division_info_and_time_by_code",
+            "description": "Uses divison code to identify division and provide details. division codes will contain both letters and numbers. do not confuse an age range with a division code for example 14-17 is not a division code",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "division_code": {
+                        "type": "string",
+                        "description": "Division code will be consist of letters and numbers and may include a -",
+                    },
+                },
+                "required": ["division_code"],
+            },
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_division_info_and_time_by_keywords",
+            "description": "Uses key words from division phrase to find closest matches.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "division_query_phrase": {
+                        "type": "string",
+                        "description": "This is the phrase the user provides to identify the division. May be something like '10-11 boys black belt sparring' or 'age 15, black belt, girls, weapons'",
+                    },
+                },
+                "required": ["division_query_phrase"],
+            },
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_place",
+            "description": "Get places around the convention center, which is where the user is.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "type": {
+                        "type": "string",
+                        "description": "The type of place that the user is looking for, ie casino, restaurant, or beach",
+                    },
+                    "keyword": {
+                        "type": "string",
+                        "description": "Keyword to search for specific types of place, e.g., 'expensive' or 'mexican' if cuisine.",
+                    },
+                },
+                "required": ["keyword"],
+            },
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_rules",
+            "description": "Get the entire ruleset for the tournament and North American Sport Karate Association. Only use this if get_relevant_rules did not return the sections needed.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                },
+            },
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_relevant_rules",
+            "description": "Searches the ruleset for the tournament and North American Sport Karate Association and returns the sections most relevant to the user's question.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "rules_question": {
+                        "type": "string",
+                        "description": "The rules question the user asked, ie 'can my coach talk to me during a sparring match'",
+                    },
+                },
+                "required": ["rules_question"],
+            },
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_overall_weekend_schedule_and_location",
+            "description": "Get the overall weekeend schedule along with location and description for events. Use this for if a user asks where registration or an event is",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                },
+            },
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_registration_times_and_locations",
+            "description": "Get the times and location of the tournament registration",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                },
+            },
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_ruleset_for_korean_challenge",
+            "description": "Get the ruleset for the korean challenge",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                },
+            },
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_promoters",
+            "description": "Get information about the promoters of the event and their contact information",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                },
+            },
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_developer_info",
+            "description": "Get information about the developer of the application, Derek Meegan",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                },
+            },
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_referee_dress_code",
+            "description": "Gets the dress code required for referees.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                },
+            },
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_ring_start_time",
+            "description": "Gets the starting time for a particular ring.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "ring": {
+                        "type": "string",
+                        "description": "Ring should be a number unless the ring is 'stage'.",
+                    },
+                    "day": {
+                        "type": "string",
+                        "description": "The day that the ring starts on. Should only be friday or saturday",
+                    },
+                },
+                "required": ["keyword"],
+            },
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_ring_schedule",
+            "description": "Gets the schedule of one or more rings on a day: when each ring starts, the division running now and the divisions coming up next. Use it for several rings at once, what's next in a ring or every ring on a day.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "rings": {
+                        "type": "string",
+                        "description": "The rings to look up, ie '5', '1, 4, 7', '1-20', 'stage' or 'all'",
+                    },
+                    "day": {
+                        "type": "string",
+                        "description": "The day of the schedule. Should only be friday or saturday",
+                    },
+                },
+                "required": ["rings"],
+            },
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_event_map",
+            "description": "Provides a map of the event.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                },
+            },
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_tournament_address",
+            "description": "Provides the address for the tournament.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                },
+            },
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_tournament_website",
+            "description": "Provides the website for the tournament.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                },
+            },
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_parking_information",
+            "description": "Provides parking information for the tournament.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                },
+            },
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_musical_rule",
+            "description": "Provides musicality rules for NASKA rated musical forms or weapons.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                },
+            },
+        }
+    },
+]
@@ -0,0 +1,49 @@
+"""
+Tournament facts that don't change during the weekend. The static tools in tools.py and the answers the
+intent router gives without the model are both rendered from these, so a change is made here once.
+"""
+
+CONVENTION_CENTER = {
+    'name': 'Atlantic City Convention Center',
+    'address': '1 Convention Blvd, Atlantic City, NJ 08401',
+    'phone': '609-449-2000',
+    'hours': '24/7',
+}
+HOTEL = {
+    'name': 'Sheraton Atlantic City',
+    'address': '2 Convention Blvd, Atlantic City, NJ 08401',
+}
+
+# (where, price and directions)
+PARKING_OPTIONS = [
+    ('Convention center parking garage', '20 dollars per day. You can access the convention center through Hall B from the parking lot.'),
+    ('Sheraton Atlantic City', '20 dollars per day for self park or 30 dollars per day for valet.'),
+]
+
+DRESS_CODE = 'Please bring your referee shirt if you already have one. A red or black referee shirt is mandatory. Judges should wear black pants and black sneakers. No hats, jackets, or coats are allowed.'
+DRESS_CODE_QUOTE = ('Sensei Bob Leiker', 'Pretty simple dress code, dress accordingly')
+
+EVENT_MAP_URL = 'https://storage.googleapis.com/naska_rules/event_map.jpg'
+WEBSITE = 'amerikickinternationals.com'
+WEBSITE_URL = f'https://{WEBSITE}/'
+REGISTRATION_URL = 'https://www.myuventex.com/#login;id=331363;eventType=SuperEvent'
+# rows of the weekend schedule that are about registration
+REGISTRATION_TERMS = ('registration', 'added divisions')
+
+PROMOTERS = ['Mark Russo', 'Bob Leiker', 'Jarrett Leiker']
+CONTACTS = ['+1 (856) 797-0300', 'bobleiker@amerikick.com', 'markrusso@amerikick.com']
+
+MUSICAL_RULE = 'Competitors in any NASKA rated musical division must have 75% choreography with their music. While this rule is currently not in the NASKA rule book it is a rule for the tournament and league.'
+
+DEVELOPER = {
+    'name': 'Derek Meegan',
+    'about': 'a technology consultant from Santa Clarita, California',
+    'website': 'derekmeegan.com',
+}
+
+def promoter_names() -> str:
+    return ', '.join(PROMOTERS[:-1]) + f', and {PROMOTERS[-1]}'
+
+def is_registration_row(row: dict) -> bool:
+    description = str(row.get('Description', '')).lower()
+    return any(term in description for term in REGISTRATION_TERMS)
@@ -0,0 +1,139 @@
+"""
+Times division query normalization: the old chain of str.replace calls against the compiled rule table.
+
+Run from the repository root:
+
+    python benchmarks/division_query.py
+    python benchmarks/division_query.py --iterations 100000
+    python benchmarks/division_query.py --check   # exits 1 if a query below no longer finds its divisions
+
+Normalization is timed on its own, then the full search against the on disk index, showing which tier
+(strict, fuzzy or closest) answered each query.
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from amerikickgpt.division_query import normalize_query, ambiguous_query
+from amerikickgpt.divisions import get_division_index, search_divisions
+
+# (query, a word the top results must include)
+QUERIES = [
+    ('10-11 boys black belt sparring', 'sparring'),
+    ('18 and over mens trad forms', 'traditional'),
+    ("women's black belt fighting", 'sparring'),
+    ('team sync forms', 'synchronized'),
+    ('13 and under korean challenge girls', 'challenge'),
+    ("16-17 boys continuous sparring", 'continuous'),
+    ('mens continuous', 'continuous'),
+    ('tradtional weapons 40 and over', 'traditional'),
+    # misspelled and over specified, these found nothing before the fuzzy tiers
+    ('team syncronized forms', 'synchronized'),
+    ('18 and over mens weopons', 'weapons'),
+    ('korean chalenge girls 13', 'challenge'),
+    ('15-17 gils black belt traditonal forms', 'traditional'),
+    ('10-11 boys black belt point sparring naska rated tall shorter', 'sparring'),
+    # ages, ranks, genders and events filter on the facet fields
+    ('age 15, black belt, girls, weapons', 'weapons'),
+    ('15 year old black belt girl sparring', 'girls'),
+    ('12 year old beginner girls musical forms', 'musical'),
+]
+
+# (query, a word every one of the top results must include), for questions whose gender or age decides the division
+TOP_RESULTS = 3
+TOP_QUERIES = [
+    ('women black belt forms', 'women'),
+    ("women's black belt fighting", 'women'),
+    ('black belt women sparring', 'women'),
+    ('men sparring', 'men'),
+    ('mens continuous', '18'),
+    ('girls sparring', 'girls'),
+    ('10-11 boys black belt sparring', 'boys'),
+]
+
+def legacy_normalize(division_query_phrase: str) -> str:
+    """
+    The rewrite chain get_division_info_and_time_by_keywords used before the rule table, for comparison.
+    """
+    division_query_phrase = division_query_phrase.lower()
+    if 'korean challenge' in division_query_phrase or 'traditional challenge' in division_query_phrase:
+        division_query_phrase = division_query_phrase.replace('and under', '')
+    if 'trad' in division_query_phrase:
+        division_query_phrase = division_query_phrase.replace(' trad ', ' traditional ')
+    if 'fighting' in division_query_phrase:
+        division_query_phrase = division_query_phrase.replace('fighting', 'sparring')
+    if 'continuous' in division_query_phrase:
+        division_query_phrase = division_query_phrase.replace('sparring', '')
+        division_query_phrase = division_query_phrase.replace("'", '')
+        division_query_phrase = division_query_phrase.replace('boys', '')
+        division_query_phrase = division_query_phrase.replace('girls', '')
+        division_query_phrase = division_query_phrase.replace('womens', '18 & Over')
+        division_query_phrase = division_query_phrase.replace('mens', '18 & Over')
+    if 'sync' in division_query_phrase and 'synchronized' not in division_query_phrase:
+        division_query_phrase = division_query_phrase.replace('sync', ' synchronized ')
+    if 'womens' in division_query_phrase or "women's" in division_query_phrase:
+        division_query_phrase = division_query_phrase.replace('womens ', 'women ').replace("women's ", ' women ')
+    elif 'mens' in division_query_phrase or "men's" in division_query_phrase:
+        division_query_phrase = division_query_phrase.replace('mens ', ' men ').replace("men's ", ' men ').replace(' mens ', ' men ').replace(" men's ", ' men ').replace(' mens', ' men').replace(" men's", ' men')
+    return division_query_phrase
+
+def new_normalize(phrase: str) -> str:
+    return ambiguous_query(phrase) or normalize_query(phrase)
+
+def time_normalize(normalize, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for query, _ in QUERIES:
+            normalize(query)
+    return (time.perf_counter() - started) / (iterations * len(QUERIES)) * 1e6
+
+def search(phrase: str) -> list:
+    return search_divisions(phrase)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterations', type = int, default = 20000)
+    parser.add_argument('--check', action = 'store_true', help = 'fail if a query does not find a division with its expected word')
+    args = parser.parse_args()
+
+    print('normalization per query:')
+    print(f'    str.replace chain  {time_normalize(legacy_normalize, args.iterations):6.2f}us')
+    print(f'    rule table         {time_normalize(new_normalize, args.iterations):6.2f}us')
+
+    get_division_index()
+    search('warm up')
+    failures = []
+    print('search per query:')
+    for query, expected in QUERIES:
+        timings = []
+        for _ in range(20):
+            started = time.perf_counter()
+            divisions = search(query)
+            timings.append((time.perf_counter() - started) * 1000)
+        found = any(expected in division['name'] for division in divisions)
+        if not found:
+            failures.append(query)
+        tier = divisions[0]['match'] if divisions else '-'
+        print(f'    {statistics.median(timings):6.2f}ms  {len(divisions)} hits  {tier:8}{"ok  " if found else "MISS"}  {query!r} -> {normalize_query(query)!r}')
+
+    print(f'top {TOP_RESULTS} results:')
+    for query, expected in TOP_QUERIES:
+        divisions = search(query)[:TOP_RESULTS]
+        found = bool(divisions) and all(re.search(rf'\b{re.escape(expected)}\b', division['name']) for division in divisions)
+        if not found:
+            failures.append(query)
+        tier = divisions[0]['match'] if divisions else '-'
+        print(f'    {tier:8}{"ok  " if found else "MISS"}  {query!r} -> {[division["name"] for division in divisions]}')
+
+    if failures:
+        print('\n'.join(['', 'queries without their expected divisions:'] + [f'    {query}' for query in failures]))
+        if args.check:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,484 @@
+"""
+Load test for the chat engine against local fakes, nothing leaves the machine.
+
+Run from the repository root:
+
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --conversations 500 --concurrency 50 --users 100
+    python benchmarks/load_test.py --mode threads        # one thread per conversation, like streamlit sessions
+    python benchmarks/load_test.py --no-cache --prefetch
+
+One local server stands in for every upstream:
+    /v1/chat/completions  scripted streaming completions that call the tools each question needs, then answer
+    /ring /judging /ruleset /divisions /places /schedule  canned endpoint responses
+Google Sheets is replaced by an in memory spreadsheet. Latency of the fake model and endpoints is configurable.
+
+Each conversation checks the user's email (a user's first one also logs in, creating their activity worksheet),
+streams the answer with engine.respond_async and logs it like the ui does.
+The report has p50/p95/p99 latency and time to first token, overall and per question, and the number of calls
+that reached each upstream.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# (weight, question, tool calls per round the fake model makes before answering)
+QUESTION_MIX = [
+    (5, 'when does ring 5 start on saturday?', [[('get_ring_start_time', {'ring': '5', 'day': 'saturday'})]]),
+    (2, "what's next in rings 1-4 on saturday?", [[('get_ring_schedule', {'rings': '1-4', 'day': 'saturday'})]]),
+    (5, 'what time is 10-11 boys black belt sparring?', [[('get_division_info_and_time_by_keywords', {'division_query_phrase': '10-11 boys black belt sparring'})]]),
+    (3, 'when is division PS27?', [[('get_division_info_and_time_by_code', {'division_code': 'PS27'})]]),
+    (4, 'can my coach talk to me during a sparring match?', [[('get_relevant_rules', {'rules_question': 'can my coach talk to me during a sparring match'})]]),
+    (3, 'what is my judging assignment?', [[('get_judging_or_scorekeeper_assignment', {})]]),
+    (2, 'where can i get mexican food nearby?', [[('get_place', {'type': 'restaurant', 'keyword': 'mexican'})]]),
+    (2, 'what should referees wear and is there a map of the venue?', [[('get_referee_dress_code', {}), ('get_event_map', {})]]),
+    (2, 'what time does my ring start and when is PS27?', [
+        [('get_judging_or_scorekeeper_assignment', {})],
+        [('get_ring_start_time', {'ring': '11', 'day': 'saturday'}), ('get_division_info_and_time_by_code', {'division_code': 'PS27'})],
+    ]),
+    # answered locally by the intent router, these never reach the model
+    (3, 'where do i park', []),
+    (1, 'what time is registration', []),
+]
+
+ANSWER = 'Here is what I found for you. Times are estimated and may change based on completion of prior divisions. This feature is powered by Uventex.'
+
+SCHEDULE_HTML = '''<table>
+<tr><td>Amerikick Internationals</td><td></td><td></td></tr>
+<tr><td>Day/Time</td><td>Description</td><td>Notes</td></tr>
+<tr><td></td><td></td><td></td></tr>
+<tr><td>Thursday 4:00pm</td><td>Registration</td><td>Sheraton lobby</td></tr>
+<tr><td>Friday 8:00am</td><td>Registration and added divisions</td><td>Hall B</td></tr>
+<tr><td>Friday 9:00am</td><td>Rings open</td><td>Hall A</td></tr>
+<tr><td>Friday 6:00pm</td><td>Team fighting</td><td>Hall A</td></tr>
+<tr><td>Friday 7:00pm</td><td>Opening ceremony</td><td>Main stage</td></tr>
+<tr><td>Saturday 8:00am</td><td>Registration</td><td>Hall B</td></tr>
+<tr><td>Saturday 9:00am</td><td>Rings open</td><td>Hall A</td></tr>
+<tr><td>Saturday 7:00pm</td><td>Grand championships</td><td>Main stage</td></tr>
+</table>'''
+
+RULESET_PAGES = json.dumps({'I': 3, 'V2': 14, 'V17': 22, 'VIII2': 31, 'IX': 40})
+
+PLACES = json.dumps({'results': [
+    {'name': f'Restaurant {number}', 'vicinity': f'{number} Pacific Ave, Atlantic City', 'rating': 4.0 + number / 10}
+    for number in range(8)
+]})
+
+CACHE_NAMES = ['ruleset_pages', 'ruleset_url', 'judging', 'ring', 'divisions', 'places', 'weekend_schedule', 'answers']
+
+class Upstream(ThreadingHTTPServer):
+    """
+    Every fake upstream behind one local server, counting the calls that reach it.
+    """
+    daemon_threads = True
+
+    def __init__(self, model_latency: float, chunk_delay: float, upstream_latency: float):
+        super().__init__(('127.0.0.1', 0), UpstreamHandler)
+        self.model_latency = model_latency
+        self.chunk_delay = chunk_delay
+        self.upstream_latency = upstream_latency
+        self.calls = Counter()
+        self.scripts = {question: rounds for _, question, rounds in QUESTION_MIX}
+        self._lock = threading.Lock()
+
+    def count(self, name: str):
+        with self._lock:
+            self.calls[name] += 1
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_port}'
+
+def completion_chunk(delta: dict, finish_reason: str = None) -> dict:
+    return {
+        'id': 'chatcmpl-load-test',
+        'object': 'chat.completion.chunk',
+        'created': int(time.time()),
+        'model': 'gpt-4o-mini',
+        'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+    }
+
+def completion_chunks(scripts: dict, request: dict):
+    """
+    The scripted completion for a request: the next round of tool calls for the question, or the answer.
+    """
+    messages = request['messages']
+    user_index = max(index for index, message in enumerate(messages) if message['role'] == 'user')
+    rounds_done = sum(1 for message in messages[user_index:] if message.get('tool_calls'))
+    rounds = scripts.get(messages[user_index]['content'], [])
+
+    if 'tools' in request and rounds_done < len(rounds):
+        for index, (name, args) in enumerate(rounds[rounds_done]):
+            call_id = f'call_{rounds_done}_{index}'
+            arguments = json.dumps(args)
+            middle = len(arguments) // 2
+            # names and arguments arrive in fragments like the real api
+            yield completion_chunk({'tool_calls': [{'index': index, 'id': call_id, 'type': 'function', 'function': {'name': name, 'arguments': ''}}]})
+            yield completion_chunk({'tool_calls': [{'index': index, 'function': {'arguments': arguments[:middle]}}]})
+            yield completion_chunk({'tool_calls': [{'index': index, 'function': {'arguments': arguments[middle:]}}]})
+        yield completion_chunk({}, 'tool_calls')
+        return
+
+    yield completion_chunk({'role': 'assistant', 'content': ''})
+    for word in ANSWER.split(' '):
+        yield completion_chunk({'content': word + ' '})
+    yield completion_chunk({}, 'stop')
+
+class UpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, body: str, content_type: str = 'text/plain', status: int = 200):
+        data = body.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        name = url.path.strip('/')
+        self.server.count(name)
+        time.sleep(self.server.upstream_latency)
+
+        if name == 'ring':
+            self.send_body(f"Ring {params.get('ring')} starts at 9:00 am on {params.get('day', 'friday').title()}")
+        elif name == 'judging':
+            self.send_body(f"{params.get('email')}: judge, ring 7, Saturday 9:00 am")
+        elif name == 'ruleset':
+            self.send_body(RULESET_PAGES, 'application/json')
+        elif name == 'divisions':
+            # the committed index is treated as current, so the background refresh never rewrites it
+            self.send_response(304)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        elif name == 'places':
+            self.send_body(PLACES, 'application/json')
+        elif name == 'schedule':
+            self.send_body(SCHEDULE_HTML, 'text/html')
+        else:
+            self.send_body('not found', status = 404)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+        if self.path != '/v1/chat/completions':
+            return self.send_body('not found', status = 404)
+        self.server.count('chat.completions')
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        time.sleep(self.server.model_latency)
+        for chunk in completion_chunks(self.server.scripts, request):
+            self.write_event(f'data: {json.dumps(chunk)}\n\n')
+            time.sleep(self.server.chunk_delay)
+        self.write_event('data: [DONE]\n\n')
+        self.wfile.write(b'0\r\n\r\n')
+
+    def write_event(self, event: str):
+        data = event.encode()
+        self.wfile.write(f'{len(data):X}\r\n'.encode() + data + b'\r\n')
+        self.wfile.flush()
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, title: str, rows: list = None):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.rows = rows or []
+
+    def col_values(self, column: int) -> list:
+        self.spreadsheet.count('col_values')
+        return [row[column - 1] for row in self.rows if len(row) >= column]
+
+    @property
+    def row_count(self) -> int:
+        # like a sheet created with 100 rows that appends grow once they are full
+        return max(100, len(self.rows))
+
+    def get_values(self, range_name: str) -> list:
+        self.spreadsheet.count('get_values')
+        first, last = (int(row) for row in re.findall(r'\d+', range_name))
+        return [row[:2] for row in self.rows[first - 1:last]]
+
+    def append_row(self, row: list):
+        self.spreadsheet.count('append_row')
+        self.rows.append(row)
+
+    def append_rows(self, rows: list):
+        self.spreadsheet.count('append_rows')
+        self.rows.extend(rows)
+
+class FakeSpreadsheet:
+    """
+    In memory stand in for the gspread spreadsheet, counting api calls.
+    """
+    def __init__(self, emails: list):
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self.worksheets = {'users': FakeWorksheet(self, 'users', [['email']] + [[email] for email in emails])}
+
+    def count(self, name: str):
+        with self._lock:
+            self.calls[name] += 1
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        import gspread
+
+        self.count('worksheet')
+        if title not in self.worksheets:
+            raise gspread.exceptions.WorksheetNotFound(title)
+        return self.worksheets[title]
+
+    def add_worksheet(self, title: str, rows: str, cols: str) -> FakeWorksheet:
+        self.count('add_worksheet')
+        with self._lock:
+            return self.worksheets.setdefault(title, FakeWorksheet(self, title))
+
+def percentile(values: list, percent: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = (len(values) - 1) * percent / 100
+    lower = int(index)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (index - lower)
+
+def summarize(values: list) -> str:
+    return ' '.join(f'p{percent} {percentile(values, percent) * 1000:7.0f}ms' for percent in (50, 95, 99))
+
+def configure_environment(args, upstream: Upstream):
+    # everything is read when amerikickgpt is imported, so this runs first
+    os.environ['OPENAI_BASE_URL'] = f'{upstream.url}/v1'
+    os.environ['OPENAI_API_KEY'] = 'load-test'
+    os.environ['RING_ENDPOINT'] = f'{upstream.url}/ring'
+    os.environ['JUDGING_ENDPOINT'] = f'{upstream.url}/judging'
+    os.environ['RULESET_ENDPOINT'] = f'{upstream.url}/ruleset'
+    os.environ['DIVISIONS_ENDPOINT'] = f'{upstream.url}/divisions'
+    os.environ['PLACES_ENDPOINT'] = f'{upstream.url}/places'
+    os.environ['SCHEDULE_ENDPOINT'] = f'{upstream.url}/schedule'
+    os.environ['SESSION_DB'] = os.path.join(tempfile.mkdtemp(prefix = 'load-test-'), 'sessions.sqlite3')
+    os.environ['SPECULATIVE_PREFETCH'] = '1' if args.prefetch else '0'
+    os.environ.pop('SECRET_COMMAND_ONE', None)
+    if args.no_cache:
+        for name in CACHE_NAMES:
+            os.environ[f'CACHE_TTL_{name.upper()}'] = '0'
+
+def pick_questions(args) -> list:
+    generator = random.Random(args.seed)
+    weights = [weight for weight, _, _ in QUESTION_MIX]
+    questions = [question for _, question, _ in QUESTION_MIX]
+    emails = [f'user{number}@loadtest.local' for number in range(args.users)]
+    return [(generator.choices(questions, weights)[0], generator.choice(emails)) for _ in range(args.conversations)]
+
+_logged_in = set()
+_logged_in_lock = threading.Lock()
+
+def log_in(email: str, session_date: str):
+    """
+    The ui's email screen: a user's first conversation creates their worksheet and logs the session.
+    """
+    from amerikickgpt.activity import ensure_worksheet_exists
+
+    with _logged_in_lock:
+        if email in _logged_in:
+            return
+        _logged_in.add(email)
+    ensure_worksheet_exists(email, f'{email}_activity', session_date, 0)
+
+def conversation(question: str, email: str):
+    """
+    One ui turn in a worker thread: verify the email, stream the answer, log it.
+    """
+    from amerikickgpt.activity import append_message_to_worksheet
+    from amerikickgpt.allowlist import is_allowed
+    from amerikickgpt.engine import respond, system_message
+    from amerikickgpt.sheet import get_sheet
+
+    session_date = datetime.now().strftime("%I:%M%p %A, %B %d")
+    started = time.perf_counter()
+    if not is_allowed(get_sheet(), email):
+        raise RuntimeError(f'{email} is not on the allowlist')
+    log_in(email, session_date)
+    first_token = None
+    chunks = []
+    for chunk in respond([system_message(session_date), {'role': 'user', 'content': question}], email):
+        if first_token is None:
+            first_token = time.perf_counter() - started
+        chunks.append(chunk)
+    latency = time.perf_counter() - started
+    append_message_to_worksheet(email, f'{email}_activity', session_date, 1, question, ''.join(chunks))
+    return latency, first_token or latency
+
+async def conversation_async(question: str, email: str):
+    from amerikickgpt.activity import append_message_to_worksheet
+    from amerikickgpt.allowlist import is_allowed
+    from amerikickgpt.engine import respond_async, system_message
+    from amerikickgpt.sheet import get_sheet
+
+    session_date = datetime.now().strftime("%I:%M%p %A, %B %d")
+    started = time.perf_counter()
+    if not is_allowed(get_sheet(), email):
+        raise RuntimeError(f'{email} is not on the allowlist')
+    await asyncio.to_thread(log_in, email, session_date)
+    first_token = None
+    chunks = []
+    async for chunk in respond_async([system_message(session_date), {'role': 'user', 'content': question}], email):
+        if first_token is None:
+            first_token = time.perf_counter() - started
+        chunks.append(chunk)
+    latency = time.perf_counter() - started
+    await asyncio.to_thread(append_message_to_worksheet, email, f'{email}_activity', session_date, 1, question, ''.join(chunks))
+    return latency, first_token or latency
+
+async def run_async(plan: list, concurrency: int) -> list:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(question, email):
+        async with semaphore:
+            try:
+                return question, await conversation_async(question, email)
+            except Exception as e:
+                return question, e
+
+    return await asyncio.gather(*(run(question, email) for question, email in plan))
+
+def run_threads(plan: list, concurrency: int) -> list:
+    def run(item):
+        question, email = item
+        try:
+            return question, conversation(question, email)
+        except Exception as e:
+            return question, e
+
+    with ThreadPoolExecutor(max_workers = concurrency) as executor:
+        return list(executor.map(run, plan))
+
+def time_tools(email: str):
+    """
+    Cold and warm latency of each tool call in the question mix, called directly.
+    """
+    from amerikickgpt import async_runtime
+    from amerikickgpt.tools import call_tool_async
+
+    calls = {}
+    for _, _, rounds in QUESTION_MIX:
+        for tool_calls in rounds:
+            for name, args in tool_calls:
+                calls.setdefault((name, json.dumps(args, sort_keys = True)), args)
+
+    print('tools (cold / warm):')
+    for (name, _), args in calls.items():
+        timings = []
+        for _ in range(2):
+            started = time.perf_counter()
+            async_runtime.run(call_tool_async(name, args, email))
+            timings.append((time.perf_counter() - started) * 1000)
+        print(f'    {name:42} {timings[0]:8.1f}ms {timings[1]:8.1f}ms  {json.dumps(args)}')
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--conversations', type = int, default = 200)
+    parser.add_argument('--concurrency', type = int, default = 20)
+    parser.add_argument('--users', type = int, default = 50, help = 'distinct verified emails the conversations are spread over')
+    parser.add_argument('--mode', choices = ['async', 'threads'], default = 'async', help = 'engine coroutines on one loop, or a thread per conversation')
+    parser.add_argument('--model-latency', type = float, default = 0.4, help = 'seconds before the fake model sends its first chunk')
+    parser.add_argument('--chunk-delay', type = float, default = 0.01, help = 'seconds between streamed chunks')
+    parser.add_argument('--upstream-latency', type = float, default = 0.08, help = 'seconds each fake endpoint takes to respond')
+    parser.add_argument('--no-cache', action = 'store_true', help = 'expire every cached upstream response and answer immediately')
+    parser.add_argument('--prefetch', action = 'store_true', help = 'enable speculative tool prefetch')
+    parser.add_argument('--skip-tools', action = 'store_true', help = "don't time the tool calls on their own first")
+    parser.add_argument('--warm-assignments', action = 'store_true', help = 'load every judging assignment before the run, as before doors open')
+    parser.add_argument('--seed', type = int, default = 1)
+    args = parser.parse_args()
+
+    upstream = Upstream(args.model_latency, args.chunk_delay, args.upstream_latency)
+    threading.Thread(target = upstream.serve_forever, daemon = True).start()
+    configure_environment(args, upstream)
+    os.chdir(ROOT)
+
+    from amerikickgpt import async_runtime, preload, sheet
+    from amerikickgpt.cache import cache_stats, invalidate_all
+    from amerikickgpt.divisions import get_division_index
+    from amerikickgpt.rulebook import get_rules_index
+    from amerikickgpt.sheet_logger import get_sheet_logger
+
+    plan = pick_questions(args)
+    spreadsheet = FakeSpreadsheet(sorted({email for _, email in plan}))
+    sheet._sheet = spreadsheet
+
+    # process start up work a long running server has already done
+    preload(background = False)
+    get_rules_index()
+    get_division_index()
+
+    if not args.skip_tools:
+        time_tools(plan[0][1])
+        invalidate_all()
+    if args.warm_assignments:
+        from amerikickgpt.assignments import load_assignments
+        load_assignments(spreadsheet)
+    upstream.calls.clear()
+    spreadsheet.calls.clear()
+
+    started = time.perf_counter()
+    if args.mode == 'async':
+        results = async_runtime.run(run_async(plan, args.concurrency))
+    else:
+        results = run_threads(plan, args.concurrency)
+    elapsed = time.perf_counter() - started
+    get_sheet_logger(spreadsheet).flush(10)
+
+    by_question = {}
+    failures = []
+    for question, result in results:
+        if isinstance(result, Exception):
+            failures.append(f'{question}: {result!r}')
+            continue
+        by_question.setdefault(question, []).append(result)
+    latencies = [latency for timings in by_question.values() for latency, _ in timings]
+    first_tokens = [first_token for timings in by_question.values() for _, first_token in timings]
+
+    print(f'{len(results)} conversations ({len(failures)} failed) in {elapsed:.2f}s, {len(latencies) / elapsed:.1f}/s, '
+          f'mode {args.mode}, concurrency {args.concurrency}')
+    print(f'    latency  {summarize(latencies)}')
+    print(f'    ttft     {summarize(first_tokens)}')
+    print('per question (count, latency p50 / p95, ttft p50):')
+    for question, timings in by_question.items():
+        question_latencies = [latency for latency, _ in timings]
+        question_first_tokens = [first_token for _, first_token in timings]
+        print(f'    {len(timings):4} {percentile(question_latencies, 50) * 1000:7.0f}ms {percentile(question_latencies, 95) * 1000:7.0f}ms '
+              f'{percentile(question_first_tokens, 50) * 1000:7.0f}ms  {question}')
+    print('upstream calls:')
+    for name, count in sorted(upstream.calls.items()):
+        print(f'    {name:20} {count:6}')
+    print('sheets calls:')
+    for name, count in sorted(spreadsheet.calls.items()):
+        print(f'    {name:20} {count:6}')
+    print('caches (hits / misses / coalesced):')
+    for name, stats in sorted(cache_stats().items()):
+        print(f"    {name:20} {stats['hits']:6} {stats['misses']:6} {stats['coalesced']:6}")
+    for failure in failures[:10]:
+        print(f'failed: {failure}')
+
+if __name__ == '__main__':
+    main()
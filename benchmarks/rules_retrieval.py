@@ -0,0 +1,103 @@
+"""
+Compares the full rulebook tool payload (get_rules) against section retrieval (get_relevant_rules).
+
+Run from the repository root:
+
+    python benchmarks/rules_retrieval.py
+    python benchmarks/rules_retrieval.py --live   # also times the follow up gpt-4o-mini completion for each payload
+
+Prompt tokens are counted with tiktoken when it is installed and estimated at 4 characters per token otherwise.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from amerikickgpt.rulebook import get_rulebook, get_page_map, search_rules
+from amerikickgpt.history import count_tokens
+
+QUESTIONS = [
+    'can my coach talk to me during a sparring match?',
+    'what happens if I drop my weapon during my form?',
+    'how do I protest a call?',
+    'what is the legal age rule?',
+    'how many points is a kick to the head?',
+    'what safety equipment do I need for sparring?',
+    'is music required to be choreographed in musical forms?',
+    'what is the time limit for a form?',
+]
+
+def full_book_payload(question: str) -> str:
+    return get_rulebook()['text'] + get_page_map()
+
+def retrieval_payload(question: str) -> str:
+    return json.dumps(search_rules(question)) + get_page_map()
+
+def time_completion(client, question: str, payload: str):
+    messages = [
+        {'role': 'system', 'content': 'Answer the question using only the rules provided.'},
+        {'role': 'user', 'content': f'{question}\n\nrules:\n{payload}'},
+    ]
+    start = time.perf_counter()
+    first_token = None
+    prompt_tokens = None
+    response = client.chat.completions.create(
+        model='gpt-4o-mini',
+        messages=messages,
+        stream=True,
+        temperature=.1,
+        stream_options={'include_usage': True},
+    )
+    for chunk in response:
+        if chunk.usage is not None:
+            prompt_tokens = chunk.usage.prompt_tokens
+        if first_token is None and chunk.choices and chunk.choices[0].delta.content:
+            first_token = time.perf_counter() - start
+    return first_token, time.perf_counter() - start, prompt_tokens
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--live', action='store_true', help='time gpt-4o-mini completions, requires OPENAI_API_KEY')
+    args = parser.parse_args()
+
+    if not os.environ.get('RULESET_ENDPOINT'):
+        # the page map is the same size for both paths so it is left out when the endpoint is not configured
+        from amerikickgpt.endpoints import fetch_ruleset_pages
+        fetch_ruleset_pages.cache.set(((), ()), '')
+
+    # warm the rulebook cache and index so only the lookup is timed
+    search_rules('warm up')
+
+    client = None
+    if args.live:
+        from openai import OpenAI
+        client = OpenAI(api_key=os.environ.get('OPENAI_API_KEY'))
+
+    for name, build_payload in [('full book', full_book_payload), ('retrieval', retrieval_payload)]:
+        tokens, build_times, first_tokens, totals = [], [], [], []
+        for question in QUESTIONS:
+            start = time.perf_counter()
+            payload = build_payload(question)
+            build_times.append((time.perf_counter() - start) * 1000)
+            tokens.append(count_tokens(payload))
+
+            if client is not None:
+                first_token, total, prompt_tokens = time_completion(client, question, payload)
+                first_tokens.append(first_token)
+                totals.append(total)
+                if prompt_tokens is not None:
+                    tokens[-1] = prompt_tokens
+
+        print(f'{name}:')
+        print(f'    prompt tokens      mean {statistics.mean(tokens):,.0f}')
+        print(f'    tool payload build mean {statistics.mean(build_times):.2f}ms')
+        if totals:
+            print(f'    time to first token mean {statistics.mean(first_tokens):.2f}s')
+            print(f'    end to end          mean {statistics.mean(totals):.2f}s')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Import time profile for each entry point, so a heavy import creeping back into startup is caught.
+
+Run from the repository root:
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 10 --top 15
+    python benchmarks/startup.py --check   # exits 1 if an entry point imports a deferred dependency or goes over --max-ms
+
+Each target is imported in a fresh interpreter with python -X importtime. "wall" is the whole process
+including interpreter start up, "imports" is the cumulative import time of the target's own imports.
+The ui target runs the top level imports of ui.py (streamlit itself is listed separately as it can't be deferred).
+"""
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# dependencies that should only load when the tool or client that needs them is first used
+DEFERRED_MODULES = ['pandas', 'openai', 'httpx', 'requests', 'whoosh', 'gspread', 'google.oauth2', 'PyPDF2', 'tiktoken']
+
+def ui_imports() -> str:
+    with open(os.path.join(ROOT, 'ui.py')) as f:
+        source = f.read()
+    tree = ast.parse(source)
+    return '\n'.join(
+        ast.get_source_segment(source, node)
+        for node in tree.body
+        if isinstance(node, (ast.Import, ast.ImportFrom)) and 'streamlit' not in ast.get_source_segment(source, node)
+    )
+
+TARGETS = {
+    'streamlit': 'import streamlit',
+    'ui': ui_imports(),
+    'engine': 'import amerikickgpt.engine',
+    'server': 'import amerikickgpt.server',
+    # what the deferred imports cost when they do load
+    'deferred': 'import ' + ', '.join(module for module in DEFERRED_MODULES if module != 'tiktoken'),
+}
+
+def parse_importtime(stderr: str):
+    """
+    Returns {module: cumulative microseconds} for every import, and the total of the top level imports.
+    Imports made by the interpreter itself before site finishes are left out.
+    """
+    modules = {}
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        top_level = not name[1:].startswith(' ')
+        if top_level and name.strip() == 'site':
+            modules, total = {}, 0
+            continue
+        modules[name.strip()] = int(cumulative)
+        if top_level:
+            total += int(cumulative)
+    return modules, total
+
+def profile(code: str, runs: int):
+    walls, totals, modules = [], [], {}
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd = ROOT, capture_output = True, text = True)
+        walls.append((time.perf_counter() - started) * 1000)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1])
+        modules, total = parse_importtime(result.stderr)
+        totals.append(total / 1000)
+    return statistics.median(walls), statistics.median(totals), modules
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type = int, default = 5)
+    parser.add_argument('--top', type = int, default = 8, help = 'slowest imports to list per target')
+    parser.add_argument('--check', action = 'store_true', help = 'fail on deferred imports or targets over --max-ms')
+    parser.add_argument('--max-ms', type = float, default = 300, help = 'import budget for the ui, engine and server targets')
+    args = parser.parse_args()
+
+    failures = []
+    for name, code in TARGETS.items():
+        wall, total, modules = profile(code, args.runs)
+        print(f'{name}:')
+        print(f'    wall     {wall:8.1f}ms')
+        print(f'    imports  {total:8.1f}ms')
+        slowest = sorted(((cumulative, module) for module, cumulative in modules.items() if '.' not in module), reverse = True)
+        for cumulative, module in slowest[:args.top]:
+            print(f'        {cumulative / 1000:8.1f}ms  {module}')
+
+        if name in ('streamlit', 'deferred'):
+            continue
+        loaded = [module for module in DEFERRED_MODULES if module in modules]
+        if loaded:
+            print(f'    deferred modules imported: {", ".join(loaded)}')
+            failures.append(f'{name} imports {", ".join(loaded)}')
+        if total > args.max_ms:
+            failures.append(f'{name} imports take {total:.1f}ms, over the {args.max_ms:.0f}ms budget')
+
+    if failures:
+        print('\n'.join(['', 'startup regressions:'] + [f'    {failure}' for failure in failures]))
+        if args.check:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()